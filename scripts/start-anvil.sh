@@ -22,9 +22,18 @@ GENESIS_PARAMS=""
 STATE_PARAMS=""
 ACCOUNTS_PARAMS="--accounts 0"
 
+if [ -n "$RESTORE_SNAPSHOT" ]; then
+    echo "Materializing snapshot $RESTORE_SNAPSHOT into /app/data/anvil-state.json"
+    python3 /app/scripts/manage-persistence.py materialize "$RESTORE_SNAPSHOT" /app/data/anvil-state.json
+fi
+
 if [ -f "/app/data/anvil-state.json" ]; then
     STATE_PARAMS="--load-state /app/data/anvil-state.json"
     echo "Loading existing state from /app/data/anvil-state.json"
+elif [ "$GENESIS_PREFUND" = "1" ] && python3 /app/scripts/build-genesis.py \
+        --base /app/config/genesis.json --output /app/config/genesis-prefunded.json; then
+    GENESIS_PARAMS="--init /app/config/genesis-prefunded.json"
+    echo "No existing state file found, using prefunded Genesis file: /app/config/genesis-prefunded.json"
 else
     GENESIS_PARAMS="--init /app/config/genesis.json"
     echo "No existing state file found, using Genesis file: /app/config/genesis.json"
@@ -20,11 +20,11 @@ echo "Generating wallets..."
 python3 /app/scripts/generate-wallets.py
 
 echo "Waiting for Anvil to be ready..."
-while ! curl -s http://node-anvil:8545 > /dev/null 2>&1; do
-    echo "Waiting for Anvil RPC..."
-    sleep 2
-done
+python3 /app/scripts/wait-ready.py --rpc-url "${ANVIL_RPC_URL:-http://node-anvil:8545}" --deadline "${READY_DEADLINE:-120}" \
+    --address "${GENESIS_ACCOUNT:-${GENESIS_ACCOUNT_ADDRESS:-0x7FbC4CBb5beEBBFCBB8cCCd94025e3aB2e292d26}}"
 
+# При GENESIS_PREFUND=1 кошельки из genesis уже профинансированы и пропускаются,
+# переводы получают только кошельки, созданные после сборки genesis
 echo "Anvil is ready, funding wallets..."
 python3 /app/scripts/fund-wallets.py
 
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import itertools
+import json
+import os
+import signal
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from readiness import probe, wait_until_ready
+from rpc_client import RpcClient
+
+POOL_FILE = '/app/data/anvil-pool.json'
+HEALTH_INTERVAL = 2.0
+
+
+class AnvilNode:
+    def __init__(self, index, port, host, command):
+        self.index = index
+        self.port = port
+        self.endpoint = f"http://{host}:{port}"
+        self.command = command
+        self.process = None
+        self.client = RpcClient(self.endpoint, timeout=2, retries=0)
+        self.healthy = False
+        self.restarts = 0
+        self.detail = None
+
+    def start(self):
+        self.process = subprocess.Popen(self.command, stdout=subprocess.DEVNULL)
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def info(self):
+        return {'index': self.index, 'endpoint': self.endpoint, 'healthy': self.healthy,
+                'restarts': self.restarts, 'detail': self.detail}
+
+
+class AnvilPool:
+    # N независимых процессов anvil с одного genesis или файла состояния на
+    # последовательных портах. Эндпоинты выдаются по кругу или в аренду
+    # (один воркер - один узел), мёртвые процессы перезапускаются.
+
+    def __init__(self, args):
+        self.args = args
+        self.nodes = [AnvilNode(index, args.base_port + index, args.host, self.node_command(args.base_port + index))
+                      for index in range(args.nodes)]
+        self.lock = threading.Lock()
+        self.round_robin = itertools.count()
+        self.leases = {}
+        self.sticky = {}
+        self.stopping = threading.Event()
+
+    def node_command(self, port):
+        args = self.args
+        command = ['anvil', '--host', args.bind, '--port', str(port), '--chain-id', str(args.chain_id),
+                   '--gas-limit', str(args.gas_limit), '--gas-price', str(args.gas_price), '--accounts', '0']
+        if args.block_time:
+            command += ['--block-time', str(args.block_time)]
+        if args.state:
+            command += ['--load-state', args.state]
+        elif args.genesis:
+            command += ['--init', args.genesis]
+        return command
+
+    def start(self):
+        for node in self.nodes:
+            node.start()
+        for node in self.nodes:
+            result = wait_until_ready(node.endpoint, self.args.deadline, self.args.chain_id)
+            node.healthy = result['ready']
+            node.detail = result['detail']
+            status = f"ready in {result['elapsed']:.2f}s" if result['ready'] else f"not ready: {result['detail']}"
+            print(f"Node {node.index} {node.endpoint} {status}")
+        self.write_pool_file()
+
+    def stop(self):
+        self.stopping.set()
+        for node in self.nodes:
+            node.stop()
+
+    def health_loop(self):
+        while not self.stopping.wait(HEALTH_INTERVAL):
+            changed = False
+            for node in self.nodes:
+                if node.process.poll() is not None:
+                    print(f"Node {node.index} exited with code {node.process.returncode}, restarting")
+                    node.restarts += 1
+                    node.start()
+                    self.drop_clients(node.endpoint)
+                    changed = True
+                healthy, node.detail = probe(node.client, self.args.chain_id)
+                if healthy != node.healthy:
+                    print(f"Node {node.index} {'healthy' if healthy else 'unhealthy'}: {node.detail}")
+                    node.healthy = healthy
+                    changed = True
+            if changed:
+                self.write_pool_file()
+
+    def drop_clients(self, endpoint):
+        # Перезапущенный узел начинает цепочку заново с genesis/состояния: аренды и
+        # закрепления снимаются, клиенты получают узел заново при следующем обращении
+        with self.lock:
+            for mapping in (self.leases, self.sticky):
+                for client_key in [key for key, value in mapping.items() if value == endpoint]:
+                    del mapping[client_key]
+
+    def write_pool_file(self):
+        if not self.args.pool_file:
+            return
+        temp_path = f"{self.args.pool_file}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.status(), f, indent=2)
+        os.replace(temp_path, self.args.pool_file)
+
+    def status(self):
+        with self.lock:
+            leases = dict(self.leases)
+        return {'nodes': [node.info() for node in self.nodes], 'leases': leases}
+
+    def next_node(self):
+        healthy = [node for node in self.nodes if node.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self.round_robin) % len(healthy)]
+
+    def lease(self, worker):
+        with self.lock:
+            if worker in self.leases:
+                return self.leases[worker]
+            leased = set(self.leases.values())
+            for node in self.nodes:
+                if node.healthy and node.endpoint not in leased:
+                    self.leases[worker] = node.endpoint
+                    return node.endpoint
+        return None
+
+    def release(self, worker):
+        with self.lock:
+            return self.leases.pop(worker, None)
+
+    def route(self, client_key):
+        # Узлы - независимые цепочки, поэтому клиент всегда попадает на один узел:
+        # арендованный им, иначе закреплённый при первом запросе
+        with self.lock:
+            endpoint = self.leases.get(client_key)
+            if endpoint is None:
+                if client_key not in self.sticky:
+                    node = self.next_node()
+                    if node is None:
+                        return None
+                    self.sticky[client_key] = node.endpoint
+                endpoint = self.sticky[client_key]
+        return next(node for node in self.nodes if node.endpoint == endpoint)
+
+    def forward(self, client_key, body):
+        node = self.route(client_key)
+        if node is None or not node.healthy:
+            # Не переключаем клиента на другой узел: там другое состояние и nonce
+            return 503, json.dumps({"jsonrpc": "2.0", "id": None, "error": {"code": -32000, "message": "node unavailable"}}).encode()
+        response = node.client.session.post(node.endpoint, data=body, headers={'Content-Type': 'application/json'},
+                                            timeout=node.client.timeout * 15)
+        return response.status_code, response.content
+
+
+def make_handler(pool):
+    class Handler(BaseHTTPRequestHandler):
+        # GET /status, /next; POST /lease?worker=ID, /release?worker=ID;
+        # POST /[?worker=ID] - JSON-RPC, проксируется на узел клиента (если включён балансировщик);
+        # клиент определяется по worker, заголовку X-Worker или IP адресу
+
+        def log_message(self, format, *args):
+            pass
+
+        def reply(self, code, body):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == '/status':
+                self.reply(200, pool.status())
+            elif path == '/next':
+                node = pool.next_node()
+                self.reply(200, {'endpoint': node.endpoint} if node else {'error': 'no healthy nodes'})
+            else:
+                self.reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            worker = parse_qs(url.query).get('worker', [None])[0]
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+            if url.path == '/lease':
+                endpoint = pool.lease(worker or self.client_address[0])
+                self.reply(200 if endpoint else 409, {'endpoint': endpoint} if endpoint else {'error': 'no free nodes'})
+            elif url.path == '/release':
+                self.reply(200, {'released': pool.release(worker or self.client_address[0])})
+            elif url.path == '/' and pool.args.balance:
+                try:
+                    client_key = worker or self.headers.get('X-Worker') or self.client_address[0]
+                    code, content = pool.forward(client_key, body)
+                except Exception as e:
+                    code, content = 502, json.dumps({"jsonrpc": "2.0", "id": None, "error": {"code": -32000, "message": str(e)}}).encode()
+                self.reply(code, content)
+            else:
+                self.reply(404, {'error': 'not found'})
+
+    return Handler
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run a pool of Anvil nodes on consecutive ports")
+    parser.add_argument('--nodes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--base-port', type=int, default=8600)
+    parser.add_argument('--host', default='localhost', help="host used in handed-out endpoints")
+    parser.add_argument('--bind', default=os.getenv('HOST', '127.0.0.1'), help="address the nodes listen on")
+    parser.add_argument('--genesis', default='/app/config/genesis.json')
+    parser.add_argument('--state', default=None, help="start every node from this state file instead of genesis")
+    parser.add_argument('--chain-id', type=int, default=int(os.getenv('CHAIN_ID', '31337')))
+    parser.add_argument('--gas-limit', type=int, default=int(os.getenv('GAS_LIMIT', '30000000')))
+    parser.add_argument('--gas-price', type=int, default=int(os.getenv('GAS_PRICE', '1000000000')))
+    parser.add_argument('--block-time', type=int, default=int(os.getenv('BLOCK_TIME', '0')))
+    parser.add_argument('--control-port', type=int, default=8599, help="HTTP port for status, leases and the balancer")
+    parser.add_argument('--balance', action='store_true', help="proxy JSON-RPC on the control port, each client pinned to one node")
+    parser.add_argument('--deadline', type=float, default=60)
+    parser.add_argument('--pool-file', default=POOL_FILE, help="write node status here ('' to disable)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.genesis and not os.path.exists(args.genesis) and not args.state:
+        args.genesis = None
+
+    pool = AnvilPool(args)
+    server = ThreadingHTTPServer(('0.0.0.0', args.control_port), make_handler(pool))
+
+    def shutdown(*_):
+        pool.stopping.set()
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    try:
+        pool.start()
+        threading.Thread(target=pool.health_loop, daemon=True).start()
+        mode = "JSON-RPC balancer and control API" if args.balance else "control API"
+        print(f"{len(pool.nodes)} nodes on ports {args.base_port}-{args.base_port + len(pool.nodes) - 1}, "
+              f"{mode} on :{args.control_port}")
+        server.serve_forever()
+    finally:
+        server.server_close()
+        pool.stop()
+        print("Pool stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from rpc_client import get_client, resolve_endpoint
+from fleet_scanner import scan_fleet, sort_rows
+from wallet_store import DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH, open_store
+
+SNAPSHOT_POOL_PATH = os.getenv('SNAPSHOT_POOL_PATH', '/app/data/snapshot-pool.json')
+
+
+class AnvilManager:
+    def __init__(self, rpc_url=None, client=None):
+        self.client = client or get_client(rpc_url or resolve_endpoint())
+        self.rpc_url = self.client.endpoint
+        self.w3 = self.client.web3
+
+    def batch_call(self, calls):
+        return self.client.batch_call(calls)
+
+    def call(self, method, params=None):
+        return self.client.call(method, params)
+
+    def check_connection(self):
+        return self.call("eth_blockNumber")['error'] is None
+
+    def get_network_info(self):
+        # Один пакетный запрос вместо проверки соединения и четырёх отдельных вызовов
+        chain_id, block_number, gas_price, accounts = self.batch_call([
+            ("eth_chainId", []),
+            ("eth_blockNumber", []),
+            ("eth_gasPrice", []),
+            ("eth_accounts", [])
+        ])
+        if chain_id['error'] is not None:
+            return None
+
+        return {
+            'connected': True,
+            'chain_id': int(chain_id['result'], 16),
+            'block_number': int(block_number['result'], 16) if block_number['error'] is None else None,
+            'gas_price': int(gas_price['result'], 16) if gas_price['error'] is None else None,
+            'accounts_count': len(accounts['result']) if accounts['error'] is None else None
+        }
+
+    def get_balances(self, addresses, block='latest'):
+        results = self.batch_call([("eth_getBalance", [address, block]) for address in addresses])
+        balances = []
+        for result in results:
+            if result['error'] is None:
+                balances.append({'balance': int(result['result'], 16), 'error': None})
+            else:
+                balances.append({'balance': None, 'error': result['error']})
+        return balances
+
+    def get_wallets_info(self, wallet_type=None, limit=None, include_code=False, sort_by='balance'):
+        try:
+            with open_store(DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH) as store:
+                rows = scan_fleet(self.rpc_url, store.iter_wallets(wallet_type, limit=limit), include_code)
+        except:
+            return None
+
+        return sort_rows(rows, sort_by)
+
+    def mine_blocks(self, count=1):
+        results = self.batch_call([("evm_mine", [])] * count)
+        return all(result['error'] is None for result in results)
+
+    def set_block_time(self, seconds):
+        return self.call("evm_setIntervalMining", [seconds * 1000])['error'] is None
+
+    def set_balances(self, balances):
+        # balances - список пар (address, wei); прямые записи состояния одним пакетом
+        results = self.batch_call([("anvil_setBalance", [address, hex(int(wei))]) for address, wei in balances])
+        return [result['error'] for result in results]
+
+    def set_nonces(self, nonces):
+        results = self.batch_call([("anvil_setNonce", [address, hex(int(nonce))]) for address, nonce in nonces])
+        return [result['error'] for result in results]
+
+    def set_storage(self, writes):
+        # writes - список (address, slot, value), slot и value - 32-байтные hex строки
+        results = self.batch_call([("anvil_setStorageAt", [address, slot, value]) for address, slot, value in writes])
+        return [result['error'] for result in results]
+
+    def snapshot(self):
+        return self.call("evm_snapshot")['result']
+
+    def revert_snapshot(self, snapshot_id):
+        result = self.call("evm_revert", [snapshot_id])
+        return result['error'] is None and result['result'] is True
+
+
+class SnapshotPool:
+    # Именованные контрольные точки поверх evm_snapshot/evm_revert. Anvil удаляет
+    # снапшот при revert (и все более поздние), поэтому после каждого revert
+    # снапшот сразу создаётся заново под тем же именем. Имена, id и статистика
+    # задержек хранятся в файле, чтобы их видели разные процессы и вызовы CLI.
+
+    def __init__(self, manager=None, path=SNAPSHOT_POOL_PATH):
+        self.manager = manager or AnvilManager()
+        self.path = path
+        self.checkpoints = {}
+        self.latency = {'reverts': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': None}
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            self.checkpoints = data.get('checkpoints', {})
+            self.latency.update(data.get('latency', {}))
+
+    def _save(self):
+        if not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'checkpoints': self.checkpoints, 'latency': self.latency}, f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def checkpoint(self, name):
+        snapshot_id = self.manager.snapshot()
+        if snapshot_id is None:
+            raise RuntimeError("evm_snapshot failed")
+        self.checkpoints[name] = snapshot_id
+        self._save()
+        return snapshot_id
+
+    def revert(self, name):
+        if name not in self.checkpoints:
+            raise KeyError(f"unknown checkpoint: {name}")
+        snapshot_id = self.checkpoints[name]
+
+        started = time.perf_counter()
+        reverted = self.manager.revert_snapshot(snapshot_id)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not reverted:
+            # Снапшот потерян (перезапуск ноды или revert к более ранней точке)
+            del self.checkpoints[name]
+            self._save()
+            raise RuntimeError(f"checkpoint {name} ({snapshot_id}) is no longer valid")
+
+        # Снапшоты, созданные после этой точки, удалены нодой вместе с ней
+        for other, other_id in list(self.checkpoints.items()):
+            if int(other_id, 16) > int(snapshot_id, 16):
+                del self.checkpoints[other]
+
+        self.latency['reverts'] += 1
+        self.latency['total_ms'] += elapsed_ms
+        self.latency['max_ms'] = max(self.latency['max_ms'], elapsed_ms)
+        self.latency['last_ms'] = elapsed_ms
+        self.checkpoint(name)
+        return elapsed_ms
+
+    def release(self, name):
+        self.checkpoints.pop(name, None)
+        self._save()
+
+    def stats(self):
+        reverts = self.latency['reverts']
+        return {
+            'checkpoints': dict(self.checkpoints),
+            'reverts': reverts,
+            'avg_revert_ms': round(self.latency['total_ms'] / reverts, 3) if reverts else None,
+            'max_revert_ms': round(self.latency['max_ms'], 3),
+            'last_revert_ms': round(self.latency['last_ms'], 3) if self.latency['last_ms'] is not None else None
+        }
+
+    @contextmanager
+    def fresh(self, name):
+        # Блок выполняется на состоянии контрольной точки name (создаётся из
+        # текущего состояния, если её ещё нет) и откатывается к ней при выходе
+        if name not in self.checkpoints:
+            self.checkpoint(name)
+        try:
+            yield self
+        except BaseException as error:
+            # Ошибка отката (например, снапшот потерян после перезапуска ноды)
+            # не должна скрывать исходную ошибку блока
+            try:
+                self.revert(name)
+            except Exception as revert_error:
+                raise error from revert_error
+            raise
+        self.revert(name)
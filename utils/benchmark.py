@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from datetime import datetime
+import aiohttp
+from eth_account import Account
+from fleet_scanner import post_batch
+from hd_wallets import generate_wallets
+from chain_cache import get_chain_cache
+from confirmations import raw_transaction_hex
+from rpc_client import get_client, resolve_endpoint
+from wallet_store import DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH, open_store
+
+ANVIL_DEV_MNEMONIC = "test test test test test test test test test test test junk"
+TRANSFER_GAS = 21000
+BLOCK_FETCH_SIZE = 100
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    position = (len(values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def latency_summary(values):
+    return {
+        'count': len(values),
+        'p50_ms': _ms(percentile(values, 50)),
+        'p90_ms': _ms(percentile(values, 90)),
+        'p99_ms': _ms(percentile(values, 99)),
+        'max_ms': _ms(max(values) if values else None),
+        'mean_ms': _ms(sum(values) / len(values) if values else None)
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+async def rpc(session, rpc_url, method, params=None):
+    response = (await post_batch(session, rpc_url, [(method, params or [])]))[0]
+    if response is None or response.get('error') is not None:
+        raise RuntimeError((response or {}).get('error', 'missing response'))
+    return response['result']
+
+
+class InclusionTracker:
+    # Следит за новыми блоками и отмечает время включения отслеживаемых транзакций
+
+    def __init__(self, session, rpc_url, start_block, poll_interval):
+        self.session = session
+        self.rpc_url = rpc_url
+        self.next_block = start_block + 1
+        self.poll_interval = poll_interval
+        self.pending = {}
+        self.blocks = []
+        self.stopped = False
+
+    def watch(self, record):
+        self.pending[record['hash']] = record
+
+    def forget(self, record):
+        self.pending.pop(record['hash'], None)
+
+    async def poll_once(self):
+        head = int(await rpc(self.session, self.rpc_url, "eth_blockNumber"), 16)
+        if head < self.next_block:
+            return False
+
+        numbers = list(range(self.next_block, head + 1))
+        for start in range(0, len(numbers), BLOCK_FETCH_SIZE):
+            chunk = numbers[start:start + BLOCK_FETCH_SIZE]
+            responses = await post_batch(self.session, self.rpc_url,
+                                         [("eth_getBlockByNumber", [hex(number), False]) for number in chunk])
+            seen_at = time.perf_counter()
+            for number, response in zip(chunk, responses):
+                block = (response or {}).get('result') or {}
+                transactions = block.get('transactions', [])
+                self.blocks.append({'number': number, 'tx_count': len(transactions),
+                                    'gas_used': int(block.get('gasUsed', '0x0'), 16)})
+                for tx_hash in transactions:
+                    record = self.pending.pop(tx_hash.lower(), None)
+                    if record is not None:
+                        record['included_at'] = seen_at
+                        record['block'] = number
+        self.next_block = head + 1
+        return True
+
+    async def run(self):
+        while not self.stopped:
+            try:
+                if not await self.poll_once():
+                    await asyncio.sleep(self.poll_interval)
+            except Exception as e:
+                print(f"Block polling error: {e}", file=sys.stderr)
+                await asyncio.sleep(self.poll_interval)
+
+    async def wait_all(self, timeout):
+        deadline = time.perf_counter() + timeout
+        while self.pending and time.perf_counter() < deadline:
+            await asyncio.sleep(self.poll_interval)
+        return not self.pending
+
+
+def presign(senders, nonces, count, fee_fields, value):
+    # Подпись выполняется до старта замера, в цикле нагрузки только отправка
+    records = []
+    for i in range(count):
+        sender_index = i % len(senders)
+        sender = senders[sender_index]
+        recipient = senders[(sender_index + 1) % len(senders)]
+        transaction = dict(fee_fields, **{
+            'to': recipient['address'],
+            'value': value,
+            'gas': TRANSFER_GAS,
+            'nonce': nonces[sender_index]
+        })
+        nonces[sender_index] += 1
+        signed_txn = Account.sign_transaction(transaction, sender['private_key'])
+        records.append({
+            'hash': '0x' + bytes(signed_txn.hash).hex(),
+            'raw': raw_transaction_hex(signed_txn),
+            'sender': sender['address'],
+            'submit_start': None,
+            'submit_end': None,
+            'included_at': None,
+            'block': None,
+            'error': None
+        })
+    return records
+
+
+async def submit(session, rpc_url, tracker, record):
+    tracker.watch(record)
+    record['submit_start'] = time.perf_counter()
+    try:
+        await rpc(session, rpc_url, "eth_sendRawTransaction", [record['raw']])
+    except Exception as e:
+        record['error'] = str(e)
+        tracker.forget(record)
+    record['submit_end'] = time.perf_counter()
+
+
+async def open_loop(session, rpc_url, tracker, records, rate):
+    started = time.perf_counter()
+    tasks = []
+    for i, record in enumerate(records):
+        delay = started + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(submit(session, rpc_url, tracker, record)))
+    await asyncio.gather(*tasks)
+
+
+async def closed_loop(session, rpc_url, tracker, records, concurrency):
+    queue = iter(records)
+
+    async def worker():
+        for record in queue:
+            await submit(session, rpc_url, tracker, record)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run_benchmark(rpc_url, senders, fee_fields, args):
+    connector = aiohttp.TCPConnector(limit=max(args.concurrency, 16) + 2, keepalive_timeout=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=args.timeout)) as session:
+        responses = await post_batch(session, rpc_url,
+                                     [("eth_getTransactionCount", [sender['address'], 'pending']) for sender in senders])
+        nonces = [int(response['result'], 16) for response in responses]
+
+        records = presign(senders, nonces, args.count, fee_fields, args.value_wei)
+
+        start_block = int(await rpc(session, rpc_url, "eth_blockNumber"), 16)
+        tracker = InclusionTracker(session, rpc_url, start_block, args.poll_interval)
+        tracker_task = asyncio.create_task(tracker.run())
+
+        started = time.perf_counter()
+        if args.rate:
+            await open_loop(session, rpc_url, tracker, records, args.rate)
+        else:
+            await closed_loop(session, rpc_url, tracker, records, args.concurrency)
+        submitted_at = time.perf_counter()
+
+        all_included = await tracker.wait_all(args.timeout)
+        tracker.stopped = True
+        await tracker_task
+
+    return build_report(records, tracker, started, submitted_at, all_included, args)
+
+
+def build_report(records, tracker, started, submitted_at, all_included, args):
+    submitted = [record for record in records if record['error'] is None]
+    included = [record for record in submitted if record['included_at'] is not None]
+    errors = {}
+    for record in records:
+        if record['error'] is not None:
+            errors[record['error']] = errors.get(record['error'], 0) + 1
+
+    last_inclusion = max((record['included_at'] for record in included), default=submitted_at)
+    elapsed = max(last_inclusion - started, 1e-9)
+    submit_elapsed = max(submitted_at - started, 1e-9)
+    blocks = [block for block in tracker.blocks if block['tx_count']]
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': {
+            'mode': 'open' if args.rate else 'closed',
+            'rate': args.rate,
+            'concurrency': None if args.rate else args.concurrency,
+            'count': args.count,
+            'senders': args.senders,
+            'block_time': args.block_time,
+            'eip1559': args.eip1559,
+            'rpc_url': args.rpc_url
+        },
+        'totals': {
+            'requested': len(records),
+            'submitted': len(submitted),
+            'included': len(included),
+            'submit_failed': len(records) - len(submitted),
+            'not_included': len(submitted) - len(included),
+            'failure_rate': round((len(records) - len(included)) / len(records), 6) if records else 0,
+            'all_included': all_included
+        },
+        'throughput': {
+            'submit_tps': round(len(submitted) / submit_elapsed, 2),
+            'included_tps': round(len(included) / elapsed, 2),
+            'elapsed_s': round(elapsed, 3),
+            'blocks': len(blocks),
+            'max_txs_per_block': max((block['tx_count'] for block in blocks), default=0),
+            'avg_gas_per_block': round(sum(block['gas_used'] for block in blocks) / len(blocks), 1) if blocks else 0
+        },
+        'submit_latency': latency_summary([record['submit_end'] - record['submit_start'] for record in records]),
+        'inclusion_latency': latency_summary([record['included_at'] - record['submit_start'] for record in included]),
+        'errors': errors
+    }
+
+
+def load_senders(args):
+    if args.spawn_anvil:
+        return generate_wallets(args.senders, ANVIL_DEV_MNEMONIC, workers=1)
+    with open_store(DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH) as store:
+        return [wallet for wallet in store.iter_wallets(args.type, limit=args.senders) if wallet['private_key']]
+
+
+def spawn_anvil(args):
+    command = ['anvil', '--port', str(args.port), '--accounts', str(args.senders),
+               '--balance', '1000000', '--mnemonic', ANVIL_DEV_MNEMONIC, '--silent']
+    if args.block_time:
+        command += ['--block-time', str(args.block_time)]
+    process = subprocess.Popen(command)
+
+    async def wait_ready():
+        async with aiohttp.ClientSession() as session:
+            for _ in range(100):
+                try:
+                    await rpc(session, args.rpc_url, "eth_blockNumber")
+                    return True
+                except Exception:
+                    await asyncio.sleep(0.1)
+        return False
+
+    if not asyncio.run(wait_ready()):
+        process.terminate()
+        raise RuntimeError("Local anvil did not start")
+    return process
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="ETH transfer throughput benchmark for the Anvil node")
+    parser.add_argument('--rpc-url', default=None, help="node endpoint (default: http://localhost:<port>)")
+    parser.add_argument('--port', type=int, default=8545)
+    parser.add_argument('--senders', type=int, default=50, help="number of concurrent sender wallets")
+    parser.add_argument('--type', default=None, help="take senders of this wallet type only")
+    parser.add_argument('--count', type=int, default=1000, help="total transfers to send")
+    parser.add_argument('--rate', type=float, default=None, help="open-loop submission rate, tx/s")
+    parser.add_argument('--concurrency', type=int, default=32, help="closed-loop in-flight submissions")
+    parser.add_argument('--value-wei', type=int, default=1)
+    parser.add_argument('--eip1559', action='store_true', help="send type 2 transactions")
+    parser.add_argument('--poll-interval', type=float, default=0.05)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--spawn-anvil', action='store_true', help="run against a local anvil binary with dev accounts")
+    parser.add_argument('--block-time', type=float, default=None, help="interval mining for --spawn-anvil")
+    parser.add_argument('--output', default=None, help="write the JSON report to this file")
+    args = parser.parse_args()
+    if args.rpc_url is None:
+        args.rpc_url = f"http://localhost:{args.port}" if args.spawn_anvil else resolve_endpoint(f"http://localhost:{args.port}")
+    return args
+
+
+def main():
+    args = parse_args()
+
+    process = spawn_anvil(args) if args.spawn_anvil else None
+    try:
+        senders = load_senders(args)
+        if not senders:
+            print("No sender wallets with private keys found")
+            sys.exit(1)
+        args.senders = len(senders)
+        fee_fields = get_chain_cache(get_client(args.rpc_url)).tx_fields(args.eip1559)
+        report = asyncio.run(run_benchmark(args.rpc_url, senders, fee_fields, args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import json
+import os
+import sys
+import time
+from wallet_store import WalletStore
+
+
+def load_accounts(store_path, accounts_path, fleet_path=None):
+    # Предпочтительно читаем хранилище потоком, genesis-accounts.json - запасной вариант
+    if fleet_path:
+        from deterministic_fleet import DeterministicFleet
+        with DeterministicFleet(fleet_path) as fleet:
+            for wallet in fleet.iter_wallets():
+                yield wallet['address'], wallet['balance']
+    elif os.path.exists(store_path):
+        store = WalletStore(store_path)
+        try:
+            for wallet in store.iter_wallets():
+                yield wallet['address'], wallet['balance']
+        finally:
+            store.close()
+    elif os.path.exists(accounts_path):
+        with open(accounts_path, 'r') as f:
+            for account in json.load(f):
+                yield account['address'], account['balance']
+
+
+def build_genesis(base_path, output_path, accounts):
+    with open(base_path, 'r') as f:
+        genesis = json.load(f)
+
+    base_alloc = genesis.pop('alloc', {})
+    known = {address.lower() for address in base_alloc}
+
+    count = 0
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write('{')
+        for key, value in genesis.items():
+            f.write(f"\n  {json.dumps(key)}: {json.dumps(value)},")
+        f.write('\n  "alloc": {')
+
+        first = True
+        for address, entry in base_alloc.items():
+            f.write(f"{'' if first else ','}\n    {json.dumps(address)}: {json.dumps(entry)}")
+            first = False
+
+        for address, balance in accounts:
+            if address.lower() in known:
+                continue
+            known.add(address.lower())
+            f.write(f"{'' if first else ','}\n    {json.dumps(address)}: {{\"balance\": \"{hex(int(balance))}\"}}")
+            first = False
+            count += 1
+
+        f.write('\n  }\n}\n')
+    os.replace(tmp_path, output_path)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge generated wallet balances into the genesis alloc")
+    parser.add_argument('--base', default='/app/config/genesis.json')
+    parser.add_argument('--output', default='/app/config/genesis-prefunded.json')
+    parser.add_argument('--store', default='/app/config/wallets.db')
+    parser.add_argument('--accounts', default='/app/config/genesis-accounts.json')
+    parser.add_argument('--fleet', default=None, help="deterministic fleet manifest instead of the wallet store")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.base):
+        print(f"Base genesis not found: {args.base}")
+        sys.exit(1)
+
+    started = time.time()
+    count = build_genesis(args.base, args.output, load_accounts(args.store, args.accounts, args.fleet))
+    print(f"Prefunded {count} accounts in {args.output} ({time.time() - started:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import time
+from rpc_client import RpcError, get_client
+
+FEE_TTL = float(os.getenv('FEE_CACHE_TTL', '2'))
+USE_EIP1559 = os.getenv('USE_EIP1559', '0') == '1'
+FEE_HISTORY_BLOCKS = 5
+PRIORITY_PERCENTILE = 50
+
+_caches = {}
+
+
+def _int(value):
+    return int(value, 16) if isinstance(value, str) else value
+
+
+class ChainCache:
+    # Статические метаданные сети (chain id, версия клиента, лимит газа блока)
+    # запрашиваются один раз на процесс. Данные о комиссиях живут fee_ttl секунд
+    # или до смены блока, если вызывающий код знает номер текущего блока.
+
+    def __init__(self, client=None, fee_ttl=FEE_TTL):
+        self.client = client or get_client()
+        self.fee_ttl = fee_ttl
+        self._static = None
+        self._fees = None
+        self._fees_at = 0
+
+    def _load_static(self):
+        if self._static is None:
+            chain_id, client_version, block = self.client.batch_call([
+                ("eth_chainId", []),
+                ("web3_clientVersion", []),
+                ("eth_getBlockByNumber", ["latest", False])
+            ])
+            if chain_id['error'] is not None:
+                raise RpcError("eth_chainId", chain_id['error'])
+            self._static = {
+                'chain_id': _int(chain_id['result']),
+                'client_version': client_version['result'],
+                'gas_limit': _int((block['result'] or {}).get('gasLimit', '0x0'))
+            }
+        return self._static
+
+    @property
+    def chain_id(self):
+        return self._load_static()['chain_id']
+
+    @property
+    def client_version(self):
+        return self._load_static()['client_version']
+
+    @property
+    def gas_limit(self):
+        return self._load_static()['gas_limit']
+
+    def invalidate_fees(self):
+        self._fees = None
+
+    def fee_data(self, block_number=None):
+        if self._fees is not None:
+            same_block = block_number is not None and block_number == self._fees['block']
+            fresh = block_number is None and time.time() - self._fees_at < self.fee_ttl
+            if same_block or fresh:
+                return self._fees
+
+        gas_price, history = self.client.batch_call([
+            ("eth_gasPrice", []),
+            ("eth_feeHistory", [hex(FEE_HISTORY_BLOCKS), "latest", [PRIORITY_PERCENTILE]])
+        ])
+        if gas_price['error'] is not None:
+            raise RpcError("eth_gasPrice", gas_price['error'])
+
+        fees = {'gas_price': _int(gas_price['result']), 'base_fee': None,
+                'max_priority_fee': None, 'max_fee': None, 'block': None}
+
+        if history['error'] is None and history['result'].get('baseFeePerGas'):
+            result = history['result']
+            # Последний элемент baseFeePerGas - базовая комиссия следующего блока
+            base_fee = _int(result['baseFeePerGas'][-1])
+            rewards = sorted(_int(reward[0]) for reward in result.get('reward') or [] if reward)
+            priority_fee = rewards[len(rewards) // 2] if rewards else 0
+            if priority_fee == 0:
+                priority_fee = max(fees['gas_price'] - base_fee, 0)
+            fees.update({
+                'base_fee': base_fee,
+                'max_priority_fee': priority_fee,
+                'max_fee': 2 * base_fee + priority_fee,
+                'block': _int(result['oldestBlock']) + len(result['baseFeePerGas']) - 2
+            })
+
+        self._fees = fees
+        self._fees_at = time.time()
+        return fees
+
+    def tx_fields(self, eip1559=USE_EIP1559, block_number=None):
+        # Поля комиссии и chainId для подписи транзакции
+        fees = self.fee_data(block_number)
+        if eip1559 and fees['max_fee'] is not None:
+            return {
+                'type': 2,
+                'chainId': self.chain_id,
+                'maxFeePerGas': fees['max_fee'],
+                'maxPriorityFeePerGas': fees['max_priority_fee']
+            }
+        return {'chainId': self.chain_id, 'gasPrice': fees['gas_price']}
+
+
+def max_fee_per_gas(fields):
+    return fields.get('maxFeePerGas', fields.get('gasPrice'))
+
+
+def get_chain_cache(client=None):
+    client = client or get_client()
+    if client.endpoint not in _caches:
+        _caches[client.endpoint] = ChainCache(client)
+    return _caches[client.endpoint]
@@ -0,0 +1,299 @@
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from rpc_client import get_client
+
+DEFAULT_INDEX_PATH = '/app/data/chain-index.db'
+RANGE_SIZE = 100
+REORG_WINDOW = 64
+
+
+def _bytes(value):
+    return bytes.fromhex(value[2:]) if value else None
+
+
+def _hex(value):
+    return '0x' + value.hex() if value is not None else None
+
+
+def _int(value):
+    return int(value, 16) if value is not None else None
+
+
+class ChainIndex:
+    # Локальный индекс блоков и транзакций: хеши и адреса хранятся как BLOB,
+    # суммы - десятичными строками (не помещаются в INTEGER). Контрольная точка
+    # (последний проиндексированный блок) пишется в одной транзакции с данными.
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS blocks (
+                number INTEGER PRIMARY KEY,
+                hash BLOB NOT NULL,
+                timestamp INTEGER,
+                gas_used INTEGER,
+                gas_limit INTEGER,
+                base_fee INTEGER,
+                tx_count INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS txs (
+                hash BLOB PRIMARY KEY,
+                block_number INTEGER NOT NULL,
+                tx_index INTEGER NOT NULL,
+                from_address BLOB,
+                to_address BLOB,
+                value TEXT,
+                nonce INTEGER,
+                gas INTEGER,
+                gas_price INTEGER,
+                gas_used INTEGER,
+                status INTEGER,
+                contract_address BLOB,
+                type INTEGER
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS txs_block ON txs (block_number, tx_index);
+            CREATE INDEX IF NOT EXISTS txs_from ON txs (from_address, block_number);
+            CREATE INDEX IF NOT EXISTS txs_to ON txs (to_address, block_number);
+            CREATE TABLE IF NOT EXISTS checkpoint (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                block_number INTEGER NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def checkpoint(self):
+        row = self.conn.execute("SELECT block_number FROM checkpoint WHERE id = 0").fetchone()
+        return row[0] if row else None
+
+    def block_hashes(self, first, last):
+        rows = self.conn.execute("SELECT number, hash FROM blocks WHERE number BETWEEN ? AND ?", (first, last))
+        return {number: _hex(block_hash) for number, block_hash in rows}
+
+    def write_range(self, blocks, transactions, last_block):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?)", blocks)
+            self.conn.executemany("INSERT OR REPLACE INTO txs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", transactions)
+            self.conn.execute("INSERT OR REPLACE INTO checkpoint VALUES (0, ?)", (last_block,))
+
+    def rollback_to(self, block_number):
+        # Удаляет всё после block_number (после revert снапшота или перезапуска ноды)
+        with self.conn:
+            self.conn.execute("DELETE FROM txs WHERE block_number > ?", (block_number,))
+            self.conn.execute("DELETE FROM blocks WHERE number > ?", (block_number,))
+            if block_number < 0:
+                self.conn.execute("DELETE FROM checkpoint")
+            else:
+                self.conn.execute("INSERT OR REPLACE INTO checkpoint VALUES (0, ?)", (block_number,))
+
+    def address_history(self, address, limit=100, offset=0):
+        key = _bytes(address.lower())
+        rows = self.conn.execute("""
+            SELECT * FROM (
+                SELECT * FROM txs WHERE from_address = ?
+                UNION
+                SELECT * FROM txs WHERE to_address = ?
+            ) ORDER BY block_number DESC, tx_index DESC LIMIT ? OFFSET ?
+        """, (key, key, limit, offset))
+        return [_row_to_tx(row) for row in rows]
+
+    def block_tx_counts(self, first=None, last=None):
+        rows = self.conn.execute("""
+            SELECT number, tx_count, gas_used, timestamp FROM blocks
+            WHERE number BETWEEN ? AND ? ORDER BY number
+        """, (first if first is not None else 0, last if last is not None else 2 ** 62))
+        return [{'block': row[0], 'tx_count': row[1], 'gas_used': row[2], 'timestamp': row[3]} for row in rows]
+
+    def stats(self):
+        blocks, first, last = self.conn.execute("SELECT COUNT(*), MIN(number), MAX(number) FROM blocks").fetchone()
+        txs = self.conn.execute("SELECT COUNT(*) FROM txs").fetchone()[0]
+        return {'checkpoint': self.checkpoint(), 'blocks': blocks, 'first_block': first, 'last_block': last, 'transactions': txs}
+
+
+def _row_to_tx(row):
+    return {
+        'hash': _hex(row[0]),
+        'block_number': row[1],
+        'tx_index': row[2],
+        'from': _hex(row[3]),
+        'to': _hex(row[4]),
+        'value': row[5],
+        'nonce': row[6],
+        'gas': row[7],
+        'gas_price': row[8],
+        'gas_used': row[9],
+        'status': row[10],
+        'contract_address': _hex(row[11]),
+        'type': row[12]
+    }
+
+
+class ChainIndexer:
+    def __init__(self, index, client=None, range_size=RANGE_SIZE):
+        self.index = index
+        self.client = client or get_client()
+        self.range_size = range_size
+        self.block_receipts = True
+
+    def head(self):
+        return int(self.client.request("eth_blockNumber"), 16)
+
+    def fetch_range(self, first, last):
+        numbers = list(range(first, last + 1))
+        results = self.client.batch_call([("eth_getBlockByNumber", [hex(number), True]) for number in numbers])
+        blocks = []
+        for number, result in zip(numbers, results):
+            if result['error'] is not None or result['result'] is None:
+                raise RuntimeError(f"block {number}: {result['error'] or 'not found'}")
+            blocks.append(result['result'])
+
+        receipts = {}
+        with_txs = [block for block in blocks if block['transactions']]
+        if with_txs and self.block_receipts:
+            results = self.client.batch_call([("eth_getBlockReceipts", [block['number']]) for block in with_txs])
+            if any(result['error'] is not None for result in results):
+                # Нода без eth_getBlockReceipts: дальше квитанции по одной транзакции
+                self.block_receipts = False
+            else:
+                for result in results:
+                    for receipt in result['result'] or []:
+                        receipts[receipt['transactionHash']] = receipt
+        if with_txs and not self.block_receipts:
+            hashes = [tx['hash'] for block in with_txs for tx in block['transactions']]
+            results = self.client.batch_call([("eth_getTransactionReceipt", [tx_hash]) for tx_hash in hashes])
+            for tx_hash, result in zip(hashes, results):
+                if result['error'] is None and result['result'] is not None:
+                    receipts[tx_hash] = result['result']
+        return blocks, receipts
+
+    def convert(self, blocks, receipts):
+        block_rows = []
+        tx_rows = []
+        for block in blocks:
+            number = _int(block['number'])
+            block_rows.append((
+                number,
+                _bytes(block['hash']),
+                _int(block['timestamp']),
+                _int(block['gasUsed']),
+                _int(block['gasLimit']),
+                _int(block.get('baseFeePerGas')),
+                len(block['transactions'])
+            ))
+            for tx in block['transactions']:
+                receipt = receipts.get(tx['hash'], {})
+                tx_rows.append((
+                    _bytes(tx['hash']),
+                    number,
+                    _int(tx['transactionIndex']),
+                    _bytes(tx['from'].lower()),
+                    _bytes(tx['to'].lower()) if tx.get('to') else None,
+                    str(_int(tx['value'])),
+                    _int(tx['nonce']),
+                    _int(tx['gas']),
+                    _int(receipt.get('effectiveGasPrice') or tx.get('gasPrice')),
+                    _int(receipt.get('gasUsed')),
+                    _int(receipt.get('status')),
+                    _bytes(receipt['contractAddress'].lower()) if receipt.get('contractAddress') else None,
+                    _int(tx.get('type', '0x0'))
+                ))
+        return block_rows, tx_rows
+
+    def tip_matches(self, number, head):
+        if number < 0:
+            return True
+        if head < number:
+            return False
+        stored = self.index.block_hashes(number, number).get(number)
+        block = self.client.request("eth_getBlockByNumber", [hex(number), False])
+        return stored is None or (block is not None and block['hash'] == stored)
+
+    def reconcile(self, head):
+        # Находит последний блок индекса, совпадающий с цепочкой, и откатывает остальное
+        checkpoint = self.index.checkpoint()
+        if checkpoint is None:
+            return -1
+        last = min(checkpoint, head)
+        while last >= 0:
+            first = max(last - REORG_WINDOW + 1, 0)
+            stored = self.index.block_hashes(first, last)
+            numbers = list(range(first, last + 1))
+            results = self.client.batch_call([("eth_getBlockByNumber", [hex(number), False]) for number in numbers])
+            for number, result in reversed(list(zip(numbers, results))):
+                chain_hash = result['result']['hash'] if result['error'] is None and result['result'] else None
+                if stored.get(number) is not None and stored[number] == chain_hash:
+                    if number != checkpoint:
+                        self.index.rollback_to(number)
+                    return number
+            last = first - 1
+        self.index.rollback_to(-1)
+        return -1
+
+    def sync(self, start=None, stop=None, follow=False, poll_interval=1.0, log=print):
+        head = self.head()
+        last = self.reconcile(head)
+        next_block = last + 1 if start is None else max(start, last + 1)
+        indexed_txs = 0
+        started = time.time()
+
+        # Следующий диапазон загружается из ноды, пока текущий пишется в базу
+        with ThreadPoolExecutor(max_workers=1) as prefetch:
+            pending = None
+            while True:
+                target = head if stop is None else min(stop, head)
+                if pending is None and next_block <= target:
+                    end = min(next_block + self.range_size - 1, target)
+                    pending = (next_block, end, prefetch.submit(self.fetch_range, next_block, end))
+
+                if pending is None:
+                    if not follow or (stop is not None and next_block > stop):
+                        break
+                    time.sleep(poll_interval)
+                    head = self.head()
+                    if not self.tip_matches(next_block - 1, head):
+                        next_block = self.reconcile(head) + 1
+                    continue
+
+                first, end, future = pending
+                blocks, receipts = future.result()
+                next_block = end + 1
+                pending = None
+                if next_block <= target:
+                    upcoming = min(next_block + self.range_size - 1, target)
+                    pending = (next_block, upcoming, prefetch.submit(self.fetch_range, next_block, upcoming))
+
+                block_rows, tx_rows = self.convert(blocks, receipts)
+                self.index.write_range(block_rows, tx_rows, end)
+                indexed_txs += len(tx_rows)
+                elapsed = max(time.time() - started, 1e-9)
+                log(f"Indexed blocks {first}-{end} ({len(tx_rows)} txs), {indexed_txs / elapsed:.0f} tx/s")
+
+                if stop is None and not follow and pending is None:
+                    head = self.head()
+        return indexed_txs
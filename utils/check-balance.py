@@ -14,31 +14,36 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import sys
 from web3 import Web3
+from fleet_scanner import scan_fleet
+from rpc_client import resolve_endpoint
 
 
-def check_balance():
-    rpc_url = "http://localhost:8545"
-    account = "0x7FbC4CBb5beEBBFCBB8cCCd94025e3aB2e292d26"
+def check_balance(accounts=None):
+    rpc_url = resolve_endpoint()
+    accounts = accounts or ["0x7FbC4CBb5beEBBFCBB8cCCd94025e3aB2e292d26"]
 
     try:
-        w3 = Web3(Web3.HTTPProvider(rpc_url))
+        rows = scan_fleet(rpc_url, [{'address': account} for account in accounts])
 
-        if not w3.is_connected():
-            print(f"❌ Failed to connect to {rpc_url}")
-            return
+        for row in rows:
+            if row['error']:
+                print(f"❌ {row['address']}: {row['error']}")
+                continue
 
-        balance_wei = w3.eth.get_balance(account)
-        balance_eth = w3.from_wei(balance_wei, 'ether')
+            balance_wei = row['balance_wei']
+            balance_eth = Web3.from_wei(balance_wei, 'ether')
 
-        print(f"Account: {account}")
-        print(f"Balance: {balance_eth:,.0f} ETH")
-        print(f"Balance (wei): {balance_wei:,}")
-        print(f"Balance (hex): {hex(balance_wei)}")
+            print(f"Account: {row['address']}")
+            print(f"Balance: {balance_eth:,.0f} ETH")
+            print(f"Balance (wei): {balance_wei:,}")
+            print(f"Balance (hex): {hex(balance_wei)}")
+            print(f"Nonce: {row['nonce']}")
 
     except Exception as e:
-        print(f"❌ Error: {e}")
+        print(f"❌ Failed to connect to {rpc_url}: {e}")
 
 
 if __name__ == "__main__":
-    check_balance()
\ No newline at end of file
+    check_balance(sys.argv[1:])
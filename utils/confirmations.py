@@ -0,0 +1,210 @@
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+import os
+import time
+from eth_account import Account
+from rpc_client import get_client
+
+POLL_INTERVAL = 0.2
+
+
+def normalize_hash(tx_hash):
+    if isinstance(tx_hash, (bytes, bytearray)):
+        return '0x' + bytes(tx_hash).hex()
+    tx_hash = tx_hash.lower()
+    return tx_hash if tx_hash.startswith('0x') else '0x' + tx_hash
+
+
+def raw_transaction_hex(signed):
+    return '0x' + bytes(signed.rawTransaction).hex()
+
+
+class NonceSender:
+    # Транзакции одного отправителя подписываются с последовательными nonce и
+    # отправляются одним пакетом. Отклонённая узлом транзакция не занимает nonce:
+    # принятые после неё транзакции убираются из пула (иначе висят за дырой),
+    # остаток переподписывается со сдвигом nonce и отправляется по одной. При
+    # ошибке транспорта узел мог принять транзакцию, поэтому nonce перечитывается.
+
+    def __init__(self, client, private_key, nonce=None):
+        self.client = client
+        self.private_key = private_key
+        self.address = Account.from_key(private_key).address
+        self.nonce = self.pending_nonce() if nonce is None else nonce
+
+    def pending_nonce(self, default=None):
+        result = self.client.call("eth_getTransactionCount", [self.address, "pending"])
+        if result['error'] is not None:
+            if default is None:
+                raise RuntimeError(f"eth_getTransactionCount failed: {result['error']}")
+            return default
+        return int(result['result'], 16)
+
+    def _sign(self, transaction, nonce):
+        transaction = dict(transaction, nonce=nonce)
+        signed = Account.sign_transaction(transaction, self.private_key)
+        return {'transaction': transaction, 'tx_hash': normalize_hash(signed.hash), 'raw': raw_transaction_hex(signed),
+                'status': 'signed', 'error': None}
+
+    def _recover(self, item, result, next_nonce):
+        # Возвращает nonce для следующей транзакции после ответа на отправку item
+        if result['error'] is None:
+            item['status'] = 'sent'
+            return next_nonce + 1
+        if result.get('transport'):
+            pending = self.pending_nonce(default=next_nonce)
+            if pending > next_nonce:
+                item['status'] = 'sent'
+                return pending
+        item['status'] = 'failed'
+        item['error'] = result['error']
+        return next_nonce
+
+    def send(self, transactions):
+        # transactions - словари без nonce; возвращает по элементу на транзакцию в том же
+        # порядке: {'transaction', 'tx_hash', 'status': 'sent' | 'failed', 'error'}
+        items = [self._sign(transaction, self.nonce + offset) for offset, transaction in enumerate(transactions)]
+        if not items:
+            return items
+        results = self.client.batch_call([("eth_sendRawTransaction", [item['raw']]) for item in items])
+
+        index = 0
+        while index < len(items) and results[index]['error'] is None:
+            items[index]['status'] = 'sent'
+            index += 1
+        if index == len(items):
+            self.nonce += len(items)
+            return items
+
+        next_nonce = self._recover(items[index], results[index], self.nonce + index)
+        index += 1
+        # Транзакции, nonce которых уже занят на узле, остаются как есть
+        while index < len(items) and items[index]['transaction']['nonce'] < next_nonce:
+            items[index]['status'] = 'sent'
+            index += 1
+
+        stuck = [item['tx_hash'] for item, result in zip(items[index:], results[index:]) if result['error'] is None]
+        if stuck:
+            self.client.batch_call([("anvil_dropTransaction", [tx_hash]) for tx_hash in stuck])
+
+        for position in range(index, len(items)):
+            item = items[position] = self._sign(items[position]['transaction'], next_nonce)
+            next_nonce = self._recover(item, self.client.call("eth_sendRawTransaction", [item['raw']]), next_nonce)
+        self.nonce = next_nonce
+        return items
+
+
+def _quantity(value):
+    return int(value, 16) if isinstance(value, str) and value.startswith('0x') else value
+
+
+def normalize_receipt(receipt):
+    receipt = dict(receipt)
+    for key in ('status', 'blockNumber', 'gasUsed', 'cumulativeGasUsed', 'effectiveGasPrice', 'transactionIndex'):
+        if key in receipt:
+            receipt[key] = _quantity(receipt[key])
+    return receipt
+
+
+class ConfirmationTracker:
+    # Подтверждает сразу много транзакций: следит за новыми блоками (WebSocket
+    # newHeads или опрос eth_blockNumber), сопоставляет ожидаемые хеши со списком
+    # транзакций блока и забирает receipt найденных одним пакетным запросом.
+    # Стоимость - порядка одного запроса на блок, а не цикл опроса на транзакцию.
+
+    def __init__(self, client=None, ws_url=None, poll_interval=POLL_INTERVAL):
+        self.client = client or get_client()
+        self.ws_url = ws_url if ws_url is not None else os.getenv('ANVIL_WS_URL')
+        self.poll_interval = poll_interval
+
+    def batch_call(self, calls):
+        return [result['result'] for result in self.client.batch_call(calls)]
+
+    def block_number(self):
+        return int(self.client.request("eth_blockNumber"), 16)
+
+    def _fetch_receipts(self, pending, hashes, receipts):
+        for tx_hash, receipt in zip(hashes, self.batch_call([("eth_getTransactionReceipt", [tx_hash]) for tx_hash in hashes])):
+            if receipt is not None:
+                receipts[tx_hash] = normalize_receipt(receipt)
+                pending.discard(tx_hash)
+
+    def _scan_blocks(self, pending, receipts, first, last):
+        blocks = self.batch_call([("eth_getBlockByNumber", [hex(number), False]) for number in range(first, last + 1)])
+        found = [tx_hash for block in blocks if block for tx_hash in block.get('transactions', []) if tx_hash in pending]
+        if found:
+            self._fetch_receipts(pending, found, receipts)
+
+    def wait(self, tx_hashes, timeout=120):
+        # Возвращает {hash: receipt или None}; None - не подтверждена до таймаута
+        pending = {normalize_hash(tx_hash) for tx_hash in tx_hashes}
+        receipts = {tx_hash: None for tx_hash in pending}
+        if not pending:
+            return receipts
+
+        next_block = self.block_number() + 1
+        # Часть транзакций могла быть включена ещё до вызова (automine)
+        self._fetch_receipts(pending, sorted(pending), receipts)
+
+        deadline = time.time() + timeout
+        if pending and self.ws_url:
+            try:
+                asyncio.run(self._follow_ws(pending, receipts, next_block, deadline))
+            except Exception as e:
+                print(f"WebSocket block subscription failed, falling back to polling: {e}")
+        if pending:
+            self._follow_polling(pending, receipts, next_block, deadline)
+        return receipts
+
+    def _follow_polling(self, pending, receipts, next_block, deadline):
+        while pending and time.time() < deadline:
+            head = self.block_number()
+            if head >= next_block:
+                self._scan_blocks(pending, receipts, next_block, head)
+                next_block = head + 1
+            else:
+                time.sleep(self.poll_interval)
+        if pending:
+            # Последняя попытка: receipt могли появиться между опросами
+            self._fetch_receipts(pending, sorted(pending), receipts)
+
+    async def _follow_ws(self, pending, receipts, next_block, deadline):
+        import websockets
+
+        async with websockets.connect(self.ws_url, max_size=None) as ws:
+            await ws.send(json.dumps({"jsonrpc": "2.0", "method": "eth_subscribe", "params": ["newHeads"], "id": 1}))
+            json.loads(await ws.recv())
+
+            # Блоки, появившиеся до подписки
+            head = self.block_number()
+            if head >= next_block:
+                self._scan_blocks(pending, receipts, next_block, head)
+                next_block = head + 1
+
+            while pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    message = json.loads(await asyncio.wait_for(ws.recv(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+                header = message.get('params', {}).get('result') or {}
+                head = int(header.get('number', '0x0'), 16)
+                if head >= next_block:
+                    self._scan_blocks(pending, receipts, next_block, head)
+                    next_block = head + 1
@@ -0,0 +1,152 @@
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+import json
+import mmap
+import os
+from functools import lru_cache
+from eth_utils import to_checksum_address
+from hd_wallets import DEFAULT_ACCOUNT_PATH, derive_private_key, iter_address_chunks
+
+DEFAULT_MANIFEST_PATH = '/app/config/fleet.json'
+ADDRESS_SIZE = 20
+KEY_CACHE_SIZE = int(os.getenv('FLEET_KEY_CACHE', '4096'))
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def _cached_key(mnemonic_phrase, account_path, index):
+    return derive_private_key(mnemonic_phrase, index, account_path)
+
+
+def precompute_addresses(path, mnemonic_phrase, count, account_path=DEFAULT_ACCOUNT_PATH, workers=None):
+    # Файл адресов дописывается: уже посчитанные индексы не выводятся повторно
+    existing = os.path.getsize(path) // ADDRESS_SIZE if os.path.exists(path) else 0
+    if existing >= count:
+        return 0
+    with open(path, 'ab') as f:
+        f.truncate(existing * ADDRESS_SIZE)
+        for chunk in iter_address_chunks(mnemonic_phrase, existing, count - existing, account_path, workers):
+            f.write(chunk)
+    return count - existing
+
+
+def write_manifest(path, mnemonic_phrase, tiers, account_path=DEFAULT_ACCOUNT_PATH, addresses_file='fleet-addresses.bin'):
+    # tiers - [{'type': 'high', 'count': n, 'balance': wei}, ...]; индексы выдаются подряд
+    start = 0
+    ranges = []
+    for tier in tiers:
+        ranges.append({'type': tier['type'], 'start': start, 'count': tier['count'], 'balance': str(tier['balance'])})
+        start += tier['count']
+    manifest = {
+        'mnemonic': mnemonic_phrase,
+        'account_path': account_path,
+        'count': start,
+        'tiers': ranges,
+        'addresses_file': addresses_file
+    }
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class DeterministicFleet:
+    # Кошелёк N - индекс N под одной мнемоникой. Адреса читаются из
+    # memory-mapped файла, ключи выводятся по требованию и кешируются (LRU).
+
+    def __init__(self, manifest_path=DEFAULT_MANIFEST_PATH):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        self.mnemonic = manifest['mnemonic']
+        self.account_path = manifest.get('account_path', DEFAULT_ACCOUNT_PATH)
+        self.count = manifest['count']
+        self.tiers = manifest['tiers']
+        self._tier_starts = [tier['start'] for tier in self.tiers]
+
+        addresses_path = os.path.join(os.path.dirname(os.path.abspath(manifest_path)), manifest['addresses_file'])
+        size = os.path.getsize(addresses_path) if os.path.exists(addresses_path) else 0
+        if size < self.count * ADDRESS_SIZE:
+            raise ValueError(f"{addresses_path} has {size // ADDRESS_SIZE} addresses, expected {self.count}")
+        # mmap не отображает пустой файл: флот из 0 кошельков или прерванная деривация
+        self._file = open(addresses_path, 'rb') if size else None
+        self._addresses = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if self._file is not None:
+            self._addresses.close()
+            self._file.close()
+
+    def _check(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(f"wallet {index} out of range 0..{self.count - 1}")
+
+    def address(self, index):
+        self._check(index)
+        offset = index * ADDRESS_SIZE
+        return to_checksum_address(self._addresses[offset:offset + ADDRESS_SIZE])
+
+    def private_key(self, index):
+        self._check(index)
+        return '0x' + _cached_key(self.mnemonic, self.account_path, index).hex()
+
+    def tier(self, index):
+        position = bisect.bisect_right(self._tier_starts, index) - 1
+        return self.tiers[position] if position >= 0 else None
+
+    def index_of(self, address):
+        needle = bytes.fromhex(address[2:] if address.startswith('0x') else address)
+        position = self._addresses.find(needle)
+        while position != -1:
+            if position % ADDRESS_SIZE == 0:
+                return position // ADDRESS_SIZE
+            position = self._addresses.find(needle, position + 1)
+        return None
+
+    def wallet(self, index, include_key=True):
+        tier = self.tier(index)
+        return {
+            'wallet_id': index,
+            'address': self.address(index),
+            'private_key': self.private_key(index) if include_key else None,
+            'mnemonic': None,
+            'index': index,
+            'balance': tier['balance'] if tier else None,
+            'balance_ether': None,
+            'type': tier['type'] if tier else None
+        }
+
+    def iter_wallets(self, wallet_type=None, offset=0, limit=None, include_keys=False):
+        # Тот же интерфейс, что WalletStore.iter_wallets; ключи выводятся только по запросу
+        ranges = [tier for tier in self.tiers if wallet_type is None or tier['type'] == wallet_type]
+        remaining = limit
+        for tier in ranges:
+            if offset >= tier['count']:
+                offset -= tier['count']
+                continue
+            for index in range(tier['start'] + offset, tier['start'] + tier['count']):
+                if remaining is not None:
+                    if remaining <= 0:
+                        return
+                    remaining -= 1
+                yield self.wallet(index, include_keys)
+            offset = 0
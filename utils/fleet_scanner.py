@@ -0,0 +1,162 @@
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import itertools
+import json
+import time
+import aiohttp
+from web3 import Web3
+from rpc_metrics import get_metrics
+
+CONCURRENCY = 8
+BATCH_SIZE = 500
+TIMEOUT = 60
+
+SORT_KEYS = {
+    'balance': (lambda row: row['balance_wei'] or 0, True),
+    'nonce': (lambda row: row['nonce'] or 0, True),
+    'id': (lambda row: row['wallet_id'] if row['wallet_id'] is not None else -1, False),
+    'address': (lambda row: row['address'].lower(), False),
+    'type': (lambda row: row['type'] or '', False)
+}
+
+
+class ScanError(Exception):
+    pass
+
+
+async def post_batch(session, rpc_url, calls):
+    payload = [{"jsonrpc": "2.0", "method": method, "params": params, "id": request_id}
+               for request_id, (method, params) in enumerate(calls)]
+    metrics = get_metrics()
+    started = time.perf_counter()
+    try:
+        async with session.post(rpc_url, json=payload) as response:
+            response.raise_for_status()
+            raw = await response.read()
+    except Exception:
+        if metrics is not None:
+            metrics.record([method for method, _ in calls], time.perf_counter() - started, failed=True)
+        raise
+    elapsed = time.perf_counter() - started
+    body = json.loads(raw)
+    if not isinstance(body, list):
+        if metrics is not None:
+            metrics.record([method for method, _ in calls], elapsed, len(json.dumps(payload)), len(raw), failed=True)
+        raise ScanError(body.get('error', {}).get('message', 'invalid batch response'))
+    responses = {item.get('id'): item for item in body}
+    if metrics is not None:
+        errors = [method for request_id, (method, _) in enumerate(calls)
+                  if responses.get(request_id, {'error': 'missing'}).get('error') is not None]
+        metrics.record([method for method, _ in calls], elapsed, len(json.dumps(payload)), len(raw), errors)
+    return [responses.get(request_id) for request_id in range(len(calls))]
+
+
+def _value(response, error_list):
+    if response is None:
+        error_list.append('missing response')
+        return None
+    if response.get('error') is not None:
+        error_list.append(response['error'].get('message', str(response['error'])))
+        return None
+    return response.get('result')
+
+
+async def _scan_chunk(session, semaphore, rpc_url, wallets, block, include_code):
+    calls = []
+    for wallet in wallets:
+        calls.append(("eth_getBalance", [wallet['address'], block]))
+        calls.append(("eth_getTransactionCount", [wallet['address'], block]))
+        if include_code:
+            calls.append(("eth_getCode", [wallet['address'], block]))
+    step = 3 if include_code else 2
+
+    async with semaphore:
+        try:
+            responses = await post_batch(session, rpc_url, calls)
+        except Exception as e:
+            responses = [{'error': {'message': str(e)}}] * len(calls)
+
+    rows = []
+    for position, wallet in enumerate(wallets):
+        errors = []
+        balance = _value(responses[position * step], errors)
+        nonce = _value(responses[position * step + 1], errors)
+        code = _value(responses[position * step + 2], errors) if include_code else None
+        balance_wei = int(balance, 16) if balance is not None else None
+        rows.append({
+            'wallet_id': wallet.get('wallet_id'),
+            'address': wallet['address'],
+            'type': wallet.get('type'),
+            'balance_wei': balance_wei,
+            'balance_eth': str(Web3.from_wei(balance_wei, 'ether')) if balance_wei is not None else None,
+            'nonce': int(nonce, 16) if nonce is not None else None,
+            'code_size': (len(code) - 2) // 2 if code is not None else None,
+            'error': '; '.join(errors) or None
+        })
+    return rows
+
+
+async def scan_fleet_async(rpc_url, wallets, include_code=False, concurrency=CONCURRENCY, batch_size=BATCH_SIZE, block=None):
+    # Один keep-alive пул соединений, не более concurrency пакетных запросов одновременно.
+    # Все чтения делаются на одном блоке, чтобы срез флота был согласованным.
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=60)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=TIMEOUT)) as session:
+        if block is None:
+            response = (await post_batch(session, rpc_url, [("eth_blockNumber", [])]))[0]
+            block = _value(response, []) or 'latest'
+
+        tasks = []
+        wallets = iter(wallets)
+        while True:
+            chunk = list(itertools.islice(wallets, batch_size))
+            if not chunk:
+                break
+            tasks.append(_scan_chunk(session, semaphore, rpc_url, chunk, block, include_code))
+
+        chunks = await asyncio.gather(*tasks)
+    return [row for chunk in chunks for row in chunk]
+
+
+def scan_fleet(rpc_url, wallets, include_code=False, concurrency=CONCURRENCY, batch_size=BATCH_SIZE, block=None):
+    return asyncio.run(scan_fleet_async(rpc_url, wallets, include_code, concurrency, batch_size, block))
+
+
+def sort_rows(rows, sort_by='balance'):
+    key, reverse = SORT_KEYS[sort_by]
+    return sorted(rows, key=key, reverse=reverse)
+
+
+def format_table(rows, include_code=False):
+    header = f"{'id':>7}  {'address':<42}  {'type':<8}  {'balance (ETH)':>24}  {'nonce':>7}"
+    if include_code:
+        header += f"  {'code':>7}"
+    lines = [header, '-' * len(header)]
+    for row in rows:
+        wallet_id = '' if row['wallet_id'] is None else row['wallet_id']
+        balance = row['balance_eth'] if row['balance_eth'] is not None else 'n/a'
+        nonce = row['nonce'] if row['nonce'] is not None else 'n/a'
+        line = f"{wallet_id:>7}  {row['address']:<42}  {row['type'] or '':<8}  {balance:>24}  {nonce:>7}"
+        if include_code:
+            line += f"  {row['code_size'] if row['code_size'] is not None else 'n/a':>7}"
+        if row['error']:
+            line += f"  error: {row['error']}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def format_json(rows):
+    return json.dumps(rows, indent=2)
@@ -14,13 +14,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
-import time
-from web3 import Web3
+import argparse
+import itertools
 from eth_account import Account
 import os
+from anvil_manager import AnvilManager
+from chain_cache import get_chain_cache
+from confirmations import ConfirmationTracker, NonceSender, normalize_hash
+from readiness import wait_until_ready
+from rpc_client import get_client, resolve_endpoint
+from wallet_store import DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH, open_store
 
-wallets_path = '/app/config/wallets.json'
 web3_url = 'http://node-anvil:8545'
 
 from dotenv import load_dotenv
@@ -29,111 +33,208 @@ load_dotenv("../.env")
 
 GENESIS_ACCOUNT = os.getenv('GENESIS_ACCOUNT')
 GENESIS_PRIVATE_KEY = os.getenv('GENESIS_PRIVATE_KEY')
+WALLET_COUNT = int(os.getenv('FUND_WALLET_COUNT', '10'))
+TRANSFER_GAS = 21000
+CHUNK_SIZE = 1000
+FUND_MODE = os.getenv('FUND_MODE', 'transfer')
 
 
-def generate_wallets():
+def generate_wallets(count=WALLET_COUNT, start_id=0):
     wallets = []
-    for i in range(10):
+    for i in range(count):
         account = Account.create()
         wallet = {
+            'wallet_id': start_id + i,
             'address': account.address,
             'private_key': account.key.hex(),
             'balance': str(int(1e18)),
-            'type': 'medium' if i < 5 else 'low'
+            'type': 'medium' if i < count // 2 else 'low'
         }
         wallets.append(wallet)
     return wallets
 
 
-def save_wallets(wallets):
-    with open(wallets_path, 'w') as f:
-        json.dump(wallets, f, indent=2)
-    print(f"Generated and saved {len(wallets)} wallets to {wallets_path}")
-
-
-def wait_for_anvil(w3, max_attempts=30):
-    for i in range(max_attempts):
-        try:
-            if w3.is_connected() and w3.eth.block_number >= 0:
-                return True
-        except:
-            pass
-        print(f"Waiting for Anvil... attempt {i + 1}/{max_attempts}")
-        time.sleep(2)
-    return False
-
-
-def fund_wallets():
-    w3 = Web3(Web3.HTTPProvider(web3_url))
-
-    if not wait_for_anvil(w3):
+def save_wallets(store, wallets):
+    store.append(wallets)
+    print(f"Generated and saved {len(wallets)} wallets to {store.path}")
+
+
+def wait_for_anvil(endpoint, deadline=60):
+    result = wait_until_ready(endpoint, deadline, log=print)
+    if result['ready']:
+        print(f"Anvil ready in {result['elapsed']:.2f}s")
+    return result['ready']
+
+
+def funding_deficits(client, wallets):
+    # Пары (wallet, недостающая сумма) только для кошельков ниже целевого баланса:
+    # повторный запуск не переводит средства уже профинансированным кошелькам
+    results = client.batch_call([("eth_getBalance", [wallet['address'], "latest"]) for wallet in wallets])
+    deficits = []
+    for wallet, result in zip(wallets, results):
+        target = int(wallet['balance'])
+        balance = int(result['result'], 16) if result['error'] is None else 0
+        if balance < target:
+            deficits.append((wallet, target - balance))
+    return deficits
+
+
+def send_funding_batch(sender, deficits, fee_fields):
+    # Подписанные заранее транзакции отправляются без ожидания receipt,
+    # восстановление после отказов и сдвиг nonce - в NonceSender
+    transactions = [dict(fee_fields, to=wallet['address'], value=value, gas=TRANSFER_GAS) for wallet, value in deficits]
+    return [dict(item, wallet=wallet) for (wallet, _), item in zip(deficits, sender.send(transactions))]
+
+
+def confirm_funding_batch(tracker, batch, timeout=120):
+    sent = [item for item in batch if item['status'] == 'sent']
+    if not sent:
+        return batch
+
+    receipts = tracker.wait([item['tx_hash'] for item in sent], timeout=timeout)
+    for item in sent:
+        receipt = receipts.get(normalize_hash(item['tx_hash']))
+        if receipt is None:
+            item['status'] = 'failed'
+            item['error'] = 'transaction not confirmed'
+        elif receipt['status'] == 1:
+            item['status'] = 'funded'
+        else:
+            item['status'] = 'failed'
+            item['error'] = 'transaction reverted'
+    return batch
+
+
+def set_balance_chunk(manager, chunk, nonce=None):
+    # Баланс пишется только кошелькам ниже целевого, без транзакций и новых блоков
+    current = manager.get_balances([wallet['address'] for wallet in chunk])
+    targets = [(wallet['address'], int(wallet['balance'])) for wallet, entry in zip(chunk, current)
+               if entry['balance'] is None or entry['balance'] < int(wallet['balance'])]
+    errors = [error for error in manager.set_balances(targets) if error] if targets else []
+    if nonce is not None:
+        errors += [error for error in manager.set_nonces([(wallet['address'], nonce) for wallet in chunk]) if error]
+
+    balances = manager.get_balances([wallet['address'] for wallet in chunk])
+    verified = sum(1 for wallet, entry in zip(chunk, balances)
+                   if entry['balance'] is not None and entry['balance'] >= int(wallet['balance']))
+    return len(targets), verified, errors
+
+
+def fund_wallets_setbalance(client, store, nonce=None):
+    manager = AnvilManager(client=client)
+    updated_count = 0
+    verified_count = 0
+    total = 0
+
+    wallets = store.iter_wallets()
+    while True:
+        chunk = list(itertools.islice(wallets, CHUNK_SIZE))
+        if not chunk:
+            break
+        updated, verified, errors = set_balance_chunk(manager, chunk, nonce)
+        updated_count += updated
+        verified_count += verified
+        total += len(chunk)
+        for error in errors[:3]:
+            print(f"anvil_setBalance/anvil_setNonce error: {error}")
+
+    print(f"Balances set for {updated_count} wallets, verified {verified_count}/{total}")
+    store.close()
+    return verified_count == total
+
+
+def fund_wallets(mode=FUND_MODE, nonce=None, fleet_path=None):
+    client = get_client(resolve_endpoint(web3_url))
+    w3 = client.web3
+
+    if not wait_for_anvil(client.endpoint):
         print("Cannot connect to Anvil after 60 seconds")
         return False
 
     print("Connected to Anvil")
 
-    wallets = generate_wallets()
-    save_wallets(wallets)
+    if fleet_path:
+        # Детерминированный флот: адреса и цели уровней из манифеста, ключи не нужны
+        from deterministic_fleet import DeterministicFleet
+        store = DeterministicFleet(fleet_path)
+    else:
+        store = open_store(DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH)
+        if store.count() == 0:
+            save_wallets(store, generate_wallets())
+
+    if mode == 'setbalance':
+        return fund_wallets_setbalance(client, store, nonce)
 
     genesis_balance = w3.eth.get_balance(GENESIS_ACCOUNT)
-    total_needed = sum(int(wallet['balance']) for wallet in wallets)
+    total_needed = 0
+    wallets = store.iter_wallets()
+    while True:
+        chunk = list(itertools.islice(wallets, CHUNK_SIZE))
+        if not chunk:
+            break
+        total_needed += sum(value for _, value in funding_deficits(client, chunk))
 
     print(f"Genesis account balance: {w3.from_wei(genesis_balance, 'ether')} ETH")
     print(f"Total ETH needed: {w3.from_wei(total_needed, 'ether')} ETH")
 
     if genesis_balance < total_needed:
         print("Insufficient balance in genesis account")
+        store.close()
         return False
 
+    fee_fields = get_chain_cache(client).tx_fields()
+    sender = NonceSender(client, GENESIS_PRIVATE_KEY)
+
+    tracker = ConfirmationTracker(client)
     funded_count = 0
     failed_count = 0
-
-    for wallet in wallets:
-        target_address = wallet['address']
-        amount_to_send = int(wallet['balance'])
-
-        try:
-            nonce = w3.eth.get_transaction_count(GENESIS_ACCOUNT)
-            gas_price = w3.eth.gas_price
-
-            transaction = {
-                'to': target_address,
-                'value': amount_to_send,
-                'gas': 21000,
-                'gasPrice': gas_price,
-                'nonce': nonce,
-                'chainId': w3.eth.chain_id
-            }
-
-            signed_txn = w3.eth.account.sign_transaction(transaction, private_key=GENESIS_PRIVATE_KEY)
-            tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-
-            receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
-
-            if receipt.status == 1:
+    skipped_count = 0
+
+    # Кошельки читаются из хранилища чанками, память не растёт с размером флота
+    wallets = store.iter_wallets()
+    while True:
+        chunk = list(itertools.islice(wallets, CHUNK_SIZE))
+        if not chunk:
+            break
+
+        deficits = funding_deficits(client, chunk)
+        skipped_count += len(chunk) - len(deficits)
+        if not deficits:
+            continue
+
+        batch = send_funding_batch(sender, deficits, fee_fields)
+        confirm_funding_batch(tracker, batch)
+
+        for item in batch:
+            target_address = item['wallet']['address']
+            if item['status'] == 'funded':
                 funded_count += 1
-                print(f"Funded {target_address}: {w3.from_wei(amount_to_send, 'ether')} ETH")
+                print(f"Funded {target_address}: {w3.from_wei(item['transaction']['value'], 'ether')} ETH")
             else:
                 failed_count += 1
-                print(f"Failed to fund {target_address}")
-
-        except Exception as e:
-            failed_count += 1
-            print(f"Error funding {target_address}: {str(e)}")
+                print(f"Failed to fund {target_address}: {item['error']}")
 
-    print(f"Funding complete: {funded_count} successful, {failed_count} failed")
+    print(f"Funding complete: {funded_count} successful, {failed_count} failed, {skipped_count} already funded")
 
     verification_count = 0
-    for wallet in wallets[:5]:
+    for wallet in store.iter_wallets(limit=5):
         balance = w3.eth.get_balance(wallet['address'])
         expected = int(wallet['balance'])
         if balance >= expected:
             verification_count += 1
         print(f"Wallet {wallet['address']}: {w3.from_wei(balance, 'ether')} ETH")
 
+    store.close()
     return verification_count >= 3
 
 
 if __name__ == "__main__":
-    success = fund_wallets()
+    parser = argparse.ArgumentParser(description="Fund wallets from the wallet store")
+    parser.add_argument('--mode', choices=['transfer', 'setbalance'], default=FUND_MODE,
+                        help="transfer from GENESIS_ACCOUNT or write balances with anvil_setBalance")
+    parser.add_argument('--set-nonce', type=int, default=None, help="setbalance mode: also set this nonce with anvil_setNonce")
+    parser.add_argument('--fleet', default=None, help="deterministic fleet manifest instead of the wallet store")
+    args = parser.parse_args()
+
+    success = fund_wallets(args.mode, args.set_nonce, args.fleet)
     exit(0 if success else 1)
@@ -14,80 +14,102 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import argparse
 import json
 import os
-from datetime import datetime
-from mnemonic import Mnemonic
-from eth_account import Account
 from web3 import Web3
-
-
-def generate_wallet_from_mnemonic(mnemonic_phrase, account_index=0):
-    Account.enable_unaudited_hdwallet_features()
-    account = Account.from_mnemonic(mnemonic_phrase, account_path=f"m/44'/60'/0'/0/{account_index}")
-    return {
-        'address': account.address,
-        'private_key': account.key.hex(),
-        'mnemonic': mnemonic_phrase,
-        'index': account_index
-    }
-
-
-def generate_random_mnemonic():
-    mnemo = Mnemonic("english")
-    return mnemo.generate(strength=128)
+from deterministic_fleet import DEFAULT_MANIFEST_PATH, precompute_addresses, write_manifest
+from hd_wallets import generate_random_mnemonic, generate_wallets
+from wallet_store import TIER_BALANCES, open_store, export_wallets, rebuild_exports
 
 
 def wei_to_ether(wei):
     return Web3.from_wei(wei, 'ether')
 
 
-def ether_to_wei(ether):
-    return Web3.to_wei(ether, 'ether')
-
-
-def backup_existing_file(filepath):
-    if os.path.exists(filepath):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = f"{filepath}.backup_{timestamp}"
-        os.rename(filepath, backup_path)
-        print(f"Backed up existing file: {backup_path}")
-
-
-def load_existing_wallets(filepath):
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate HD wallets for the Anvil network")
+    parser.add_argument('--high', type=int, default=5, help="number of high balance wallets (0.5 ETH)")
+    parser.add_argument('--medium', type=int, default=15, help="number of medium balance wallets (0.1 ETH)")
+    parser.add_argument('--low', type=int, default=30, help="number of low balance wallets (0.05 ETH)")
+    parser.add_argument('--workers', type=int, default=None, help="derivation processes (default: CPU count)")
+    parser.add_argument('--mnemonic', default=None, help="derive all wallets from this mnemonic by index")
+    parser.add_argument('--shared-mnemonic', action='store_true', help="generate one mnemonic and derive all wallets from it")
+    parser.add_argument('--rebuild-exports', action='store_true', help="rewrite all export files from the wallet store")
+    parser.add_argument('--deterministic', action='store_true',
+                        help="write a fleet manifest and precomputed address file instead of storing keys")
+    return parser.parse_args()
+
+
+def generate_deterministic(args, balance_configs):
+    # Одна мнемоника, кошелёк N - индекс N. Ключи не сохраняются: только манифест
+    # и файл адресов по 20 байт, который читается через mmap (deterministic_fleet.py)
+    manifest_path = DEFAULT_MANIFEST_PATH
+    addresses_path = os.path.join(os.path.dirname(manifest_path), 'fleet-addresses.bin')
+
+    mnemonic_phrase = args.mnemonic
+    if mnemonic_phrase is None and os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            mnemonic_phrase = json.load(f)['mnemonic']
+    if mnemonic_phrase is None:
+        mnemonic_phrase = generate_random_mnemonic()
+        # Адреса от прежней мнемоники не подходят новой
+        if os.path.exists(addresses_path):
+            os.remove(addresses_path)
+    elif args.mnemonic is not None and os.path.exists(addresses_path):
+        previous = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                previous = json.load(f)['mnemonic']
+        if previous != mnemonic_phrase:
+            os.remove(addresses_path)
+
+    manifest = write_manifest(manifest_path, mnemonic_phrase, balance_configs, addresses_file=os.path.basename(addresses_path))
+    derived = precompute_addresses(addresses_path, mnemonic_phrase, manifest['count'], workers=args.workers)
+
+    print(f"Deterministic fleet: {manifest['count']} wallets ({derived} new addresses derived)")
+    for tier in manifest['tiers']:
+        print(f"- {tier['type']}: indexes {tier['start']}..{tier['start'] + tier['count'] - 1}")
+    if args.mnemonic is None:
+        print(f"Mnemonic: {mnemonic_phrase}")
+    print("Files updated:")
+    print(f"- {manifest_path}")
+    print(f"- {addresses_path}")
 
 
 def main():
+    args = parse_args()
     output_dir = '/app/config'
     os.makedirs(output_dir, exist_ok=True)
 
-    wallets_file = f'{output_dir}/wallets.json'
-    existing_wallets = load_existing_wallets(wallets_file)
+    balance_configs = [
+        {'count': args.high, 'balance': TIER_BALANCES['high'], 'type': 'high'},
+        {'count': args.medium, 'balance': TIER_BALANCES['medium'], 'type': 'medium'},
+        {'count': args.low, 'balance': TIER_BALANCES['low'], 'type': 'low'}
+    ]
+
+    if args.deterministic:
+        generate_deterministic(args, balance_configs)
+        return
 
-    if existing_wallets:
-        print(f"Found {len(existing_wallets)} existing wallets")
-        backup_existing_file(wallets_file)
+    store = open_store(f'{output_dir}/wallets.db', f'{output_dir}/wallets.json')
+    existing_count = store.count()
+
+    if existing_count:
+        print(f"Found {existing_count} existing wallets")
 
     wallets = []
-    balance_configs = [
-        {'count': 5, 'balance': ether_to_wei(0.5), 'type': 'high'},
-        {'count': 15, 'balance': ether_to_wei(0.1), 'type': 'medium'},
-        {'count': 30, 'balance': ether_to_wei(0.05), 'type': 'low'}
-    ]
+    mnemonic_phrase = args.mnemonic
+    if mnemonic_phrase is None and args.shared_mnemonic:
+        mnemonic_phrase = generate_random_mnemonic()
 
-    wallet_index = len(existing_wallets)
+    wallet_index = store.next_wallet_id()
+    total_count = sum(config['count'] for config in balance_configs)
+    generated = iter(generate_wallets(total_count, mnemonic_phrase, start_index=wallet_index, workers=args.workers))
 
     for config in balance_configs:
         for i in range(config['count']):
-            mnemonic = generate_random_mnemonic()
-            wallet = generate_wallet_from_mnemonic(mnemonic, 0)
+            wallet = next(generated)
             wallet['balance'] = str(config['balance'])
             wallet['balance_ether'] = str(wei_to_ether(config['balance']))
             wallet['type'] = config['type']
@@ -95,69 +117,47 @@ def main():
             wallets.append(wallet)
             wallet_index += 1
 
-    all_wallets = existing_wallets + wallets
-
-    with open(wallets_file, 'w') as f:
-        json.dump(all_wallets, f, indent=2)
-
-    accounts_for_anvil = []
-    for wallet in all_wallets:
-        accounts_for_anvil.append({
-            'address': wallet['address'],
-            'balance': wallet['balance']
-        })
-
-    genesis_file = f'{output_dir}/genesis-accounts.json'
-    backup_existing_file(genesis_file)
-    with open(genesis_file, 'w') as f:
-        json.dump(accounts_for_anvil, f, indent=2)
-
-    private_keys = [wallet['private_key'] for wallet in all_wallets]
-    keys_file = f'{output_dir}/private-keys.txt'
-    backup_existing_file(keys_file)
-    with open(keys_file, 'w') as f:
-        for key in private_keys:
-            f.write(f"{key}\n")
-
-    metamask_import = []
-    for wallet in all_wallets:
-        metamask_import.append({
-            'mnemonic': wallet['mnemonic'],
-            'address': wallet['address'],
-            'private_key': wallet['private_key'],
-            'balance_ether': wallet['balance_ether'],
-            'type': wallet['type']
-        })
-
-    metamask_file = f'{output_dir}/metamask-wallets.json'
-    backup_existing_file(metamask_file)
-    with open(metamask_file, 'w') as f:
-        json.dump(metamask_import, f, indent=2)
+    store.append(wallets)
+
+    if args.rebuild_exports:
+        rebuild_exports(store, output_dir)
+    else:
+        export_wallets(store, output_dir, wallets)
+
+    totals = store.balance_totals()
+    total_wallets = sum(entry['count'] for entry in totals.values())
+
+    def type_count(wallet_type):
+        return totals.get(wallet_type, {}).get('count', 0)
 
     summary = {
-        'total_wallets': len(all_wallets),
-        'existing_wallets': len(existing_wallets),
+        'total_wallets': total_wallets,
+        'existing_wallets': existing_count,
         'new_wallets': len(wallets),
-        'high_balance': {'count': len([w for w in all_wallets if w['type'] == 'high']), 'balance_each': '0.5 ETH'},
-        'medium_balance': {'count': len([w for w in all_wallets if w['type'] == 'medium']), 'balance_each': '0.1 ETH'},
-        'low_balance': {'count': len([w for w in all_wallets if w['type'] == 'low']), 'balance_each': '0.05 ETH'},
-        'total_eth': str(wei_to_ether(sum(int(w['balance']) for w in all_wallets))),
+        'high_balance': {'count': type_count('high'), 'balance_each': f"{wei_to_ether(TIER_BALANCES['high'])} ETH"},
+        'medium_balance': {'count': type_count('medium'), 'balance_each': f"{wei_to_ether(TIER_BALANCES['medium'])} ETH"},
+        'low_balance': {'count': type_count('low'), 'balance_each': f"{wei_to_ether(TIER_BALANCES['low'])} ETH"},
+        'total_eth': str(wei_to_ether(sum(entry['total_wei'] for entry in totals.values()))),
         'chain_id': '31337',
         'network_name': 'Anvil Local'
     }
 
     summary_file = f'{output_dir}/wallet-summary.json'
-    backup_existing_file(summary_file)
     with open(summary_file, 'w') as f:
         json.dump(summary, f, indent=2)
 
+    store.close()
+
     print(f"Generated {len(wallets)} new wallets")
-    print(f"Total wallets: {len(all_wallets)} (existing: {len(existing_wallets)}, new: {len(wallets)})")
-    print(f"High balance wallets: {len([w for w in all_wallets if w['type'] == 'high'])}")
-    print(f"Medium balance wallets: {len([w for w in all_wallets if w['type'] == 'medium'])}")
-    print(f"Low balance wallets: {len([w for w in all_wallets if w['type'] == 'low'])}")
+    if args.shared_mnemonic and args.mnemonic is None:
+        print(f"Shared mnemonic: {mnemonic_phrase}")
+    print(f"Total wallets: {total_wallets} (existing: {existing_count}, new: {len(wallets)})")
+    print(f"High balance wallets: {type_count('high')}")
+    print(f"Medium balance wallets: {type_count('medium')}")
+    print(f"Low balance wallets: {type_count('low')}")
     print(f"Total ETH distributed: {summary['total_eth']}")
     print("Files updated:")
+    print("- /app/config/wallets.db")
     print("- /app/config/wallets.json")
     print("- /app/config/genesis-accounts.json")
     print("- /app/config/private-keys.txt")
@@ -166,4 +166,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,132 @@
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import hmac
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from eth_account import Account
+from eth_account.hdaccount import seed_from_mnemonic
+from eth_account.hdaccount.deterministic import HardNode, SoftNode, derive_child_key
+from eth_keys import keys
+from mnemonic import Mnemonic
+
+DEFAULT_ACCOUNT_PATH = "m/44'/60'/0'/0"
+CHUNK_SIZE = 256
+
+_mnemo = Mnemonic("english")
+
+
+def generate_random_mnemonic():
+    return _mnemo.generate(strength=128)
+
+
+def parse_path(path):
+    nodes = []
+    for part in path.split('/')[1:]:
+        if part.endswith("'") or part.endswith('H'):
+            nodes.append(HardNode(int(part[:-1])))
+        else:
+            nodes.append(SoftNode(int(part)))
+    return nodes
+
+
+@lru_cache(maxsize=64)
+def account_node(mnemonic_phrase, account_path=DEFAULT_ACCOUNT_PATH, passphrase=""):
+    # PBKDF2 и hardened часть пути считаются один раз на мнемонику,
+    # дальше каждый индекс - одна soft-деривация от закешированного узла
+    seed = seed_from_mnemonic(mnemonic_phrase, passphrase)
+    master = hmac.new(b"Bitcoin seed", seed, hashlib.sha512).digest()
+    key, chain_code = master[:32], master[32:]
+    for node in parse_path(account_path):
+        key, chain_code = derive_child_key(key, chain_code, node)
+    return key, chain_code
+
+
+def derive_private_key(mnemonic_phrase, account_index=0, account_path=DEFAULT_ACCOUNT_PATH):
+    key, chain_code = account_node(mnemonic_phrase, account_path)
+    child_key, _ = derive_child_key(key, chain_code, SoftNode(account_index))
+    return child_key
+
+
+def generate_wallet_from_mnemonic(mnemonic_phrase, account_index=0):
+    account = Account.from_key(derive_private_key(mnemonic_phrase, account_index))
+    return {
+        'address': account.address,
+        'private_key': account.key.hex(),
+        'mnemonic': mnemonic_phrase,
+        'index': account_index
+    }
+
+
+def _random_wallets(count):
+    wallets = []
+    for _ in range(count):
+        mnemonic_phrase = generate_random_mnemonic()
+        wallets.append(generate_wallet_from_mnemonic(mnemonic_phrase, 0))
+    return wallets
+
+
+def _indexed_wallets(task):
+    mnemonic_phrase, start, stop = task
+    return [generate_wallet_from_mnemonic(mnemonic_phrase, index) for index in range(start, stop)]
+
+
+def _indexed_addresses(task):
+    # Только адреса (20 байт каждый), без объектов Account и hex-строк ключей
+    mnemonic_phrase, account_path, start, stop = task
+    key, chain_code = account_node(mnemonic_phrase, account_path)
+    addresses = bytearray()
+    for index in range(start, stop):
+        child_key, _ = derive_child_key(key, chain_code, SoftNode(index))
+        addresses += keys.PrivateKey(child_key).public_key.to_canonical_address()
+    return bytes(addresses)
+
+
+def iter_address_chunks(mnemonic_phrase, start_index, count, account_path=DEFAULT_ACCOUNT_PATH, workers=None, chunk_size=CHUNK_SIZE * 16):
+    # Чанки адресов по порядку индексов; пул процессов обрабатывает окно чанков за раз
+    workers = workers or os.cpu_count() or 1
+    tasks = [(mnemonic_phrase, account_path, start, stop) for start, stop in _chunks(start_index, start_index + count, chunk_size)]
+    if workers == 1 or len(tasks) <= 1:
+        yield from map(_indexed_addresses, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for offset in range(0, len(tasks), workers * 4):
+            yield from executor.map(_indexed_addresses, tasks[offset:offset + workers * 4])
+
+
+def _chunks(start, stop, size):
+    return [(offset, min(offset + size, stop)) for offset in range(start, stop, size)]
+
+
+def generate_wallets(count, mnemonic_phrase=None, start_index=0, workers=None, chunk_size=CHUNK_SIZE):
+    # Без mnemonic_phrase каждый кошелёк получает свою случайную мнемонику (индекс 0),
+    # иначе кошельки выводятся из одной мнемоники по индексам start_index..start_index+count-1.
+    # Работа делится на чанки и раздаётся пулу процессов; порядок результата сохраняется.
+    workers = workers or os.cpu_count() or 1
+
+    if mnemonic_phrase is None:
+        tasks = [stop - start for start, stop in _chunks(0, count, chunk_size)]
+        worker = _random_wallets
+    else:
+        tasks = [(mnemonic_phrase, start, stop) for start, stop in _chunks(start_index, start_index + count, chunk_size)]
+        worker = _indexed_wallets
+
+    if workers == 1 or len(tasks) <= 1:
+        results = map(worker, tasks)
+        return [wallet for chunk in results for wallet in chunk]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [wallet for chunk in executor.map(worker, tasks) for wallet in chunk]
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import json
+import os
+import sys
+from chain_index import DEFAULT_INDEX_PATH, RANGE_SIZE, ChainIndex, ChainIndexer
+from rpc_client import get_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lightweight block and transaction indexer")
+    parser.add_argument('--db', default=os.getenv('CHAIN_INDEX_PATH', DEFAULT_INDEX_PATH))
+    parser.add_argument('--rpc-url', default=None)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    sync_parser = subparsers.add_parser('sync', help="index blocks from the last checkpoint")
+    sync_parser.add_argument('--from', dest='start', type=int, default=None)
+    sync_parser.add_argument('--to', dest='stop', type=int, default=None)
+    sync_parser.add_argument('--range', dest='range_size', type=int, default=RANGE_SIZE)
+    sync_parser.add_argument('--follow', action='store_true', help="keep following new blocks")
+    sync_parser.add_argument('--poll', type=float, default=1.0)
+
+    address_parser = subparsers.add_parser('address', help="transactions from or to an address")
+    address_parser.add_argument('address')
+    address_parser.add_argument('--limit', type=int, default=100)
+    address_parser.add_argument('--offset', type=int, default=0)
+
+    blocks_parser = subparsers.add_parser('blocks', help="transaction count per block")
+    blocks_parser.add_argument('--from', dest='start', type=int, default=None)
+    blocks_parser.add_argument('--to', dest='stop', type=int, default=None)
+
+    subparsers.add_parser('status', help="index checkpoint and size")
+
+    args = parser.parse_args()
+
+    with ChainIndex(args.db) as index:
+        if args.command == 'sync':
+            indexer = ChainIndexer(index, get_client(args.rpc_url), args.range_size)
+            try:
+                count = indexer.sync(args.start, args.stop, args.follow, args.poll)
+            except KeyboardInterrupt:
+                print(f"Stopped at block {index.checkpoint()}")
+                return
+            except Exception as e:
+                print(f"Indexing failed at block {index.checkpoint()}: {e}")
+                sys.exit(1)
+            print(f"Indexed {count} transactions, checkpoint {index.checkpoint()}")
+
+        elif args.command == 'address':
+            print(json.dumps(index.address_history(args.address, args.limit, args.offset), indent=2))
+
+        elif args.command == 'blocks':
+            for row in index.block_tx_counts(args.start, args.stop):
+                print(f"{row['block']:>10} {row['tx_count']:>6} {row['gas_used']:>12}")
+
+        elif args.command == 'status':
+            print(json.dumps(index.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
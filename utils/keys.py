@@ -1,8 +1,59 @@
+import argparse
+import json
 import os
-from dotenv import load_dotenv
+import random
+import sys
+from itertools import islice
+from multiprocessing import Pool
+from dotenv import dotenv_values
 from eth_keys import keys
+from eth_utils import keccak, to_checksum_address
 from web3 import Web3
 
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
+BACKEND = 'coincurve' if coincurve is not None else 'eth_keys'
+CHUNK_SIZE = 4096
+
+
+def normalize_key(key):
+    key = key.strip()
+    if key.startswith('0x'):
+        key = key[2:]
+    return '0x' + key.zfill(64)
+
+
+def derive_address(private_key):
+    # Одна деривация публичного ключа на ключ самым быстрым доступным бэкендом
+    key_bytes = bytes.fromhex(private_key[2:])
+    if coincurve is not None:
+        public_key = coincurve.PublicKey.from_secret(key_bytes).format(compressed=False)[1:]
+    else:
+        public_key = keys.PrivateKey(key_bytes).public_key.to_bytes()
+    return to_checksum_address(keccak(public_key)[-20:])
+
+
+def _derive_chunk(chunk):
+    results = []
+    for index, key in chunk:
+        try:
+            results.append((index, key, derive_address(key), None))
+        except Exception as e:
+            results.append((index, key, None, str(e)))
+    return results
+
+
+def _read_chunks(lines, chunk_size):
+    numbered = ((index, normalize_key(line)) for index, line in enumerate(line for line in lines if line.strip()))
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
 
 class EthereumKeysProcessor:
     def __init__(self, env_path='../.env'):
@@ -10,10 +61,10 @@ class EthereumKeysProcessor:
         self.private_keys = []
 
     def load_private_keys(self):
-        load_dotenv(self.env_path)
+        env = dotenv_values(self.env_path)
         keys_data = []
         for i in ['GENESIS_PRIVATE_KEY', 'ANVIL_DEPLOYER_PRIVATE_KEY', 'ANVIL_KEEPER_PRIVATE_KEY', 'USER1_PRIVATE_KEY', 'USER2_PRIVATE_KEY']:
-            original_key = os.environ[i]
+            original_key = os.environ.get(i) or env[i]
             key = original_key
             if key.startswith('0x'):
                 key = key[2:]
@@ -43,12 +94,38 @@ class EthereumKeysProcessor:
                                     'public_key': '0x' + account._key_obj.public_key.to_hex(), 'address': account.address}
         return results
 
+    def process_bulk(self, lines, workers=None, chunk_size=CHUNK_SIZE, validate_sample=0.0):
+        # Ключи читаются и обрабатываются чанками в пуле процессов, результаты
+        # отдаются по мере готовности в исходном порядке. Сверка с web3 - только
+        # для случайной выборки ключей.
+        w3 = Web3()
+        stats = {'processed': 0, 'errors': 0, 'validated': 0, 'mismatches': 0}
+        workers = workers or os.cpu_count() or 1
+        chunks = _read_chunks(lines, chunk_size)
+        with Pool(processes=workers) as pool:
+            while True:
+                # Окно из нескольких чанков на процесс ограничивает память при любом размере входа
+                window = list(islice(chunks, workers * 4))
+                if not window:
+                    break
+                for index, key, address, error in (item for chunk in pool.map(_derive_chunk, window) for item in chunk):
+                    stats['processed'] += 1
+                    if error is not None:
+                        stats['errors'] += 1
+                    elif validate_sample and random.random() < validate_sample:
+                        stats['validated'] += 1
+                        if w3.eth.account.from_key(key).address != address:
+                            stats['mismatches'] += 1
+                            error = 'web3 address mismatch'
+                    yield {'index': index, 'private_key': key, 'address': address, 'error': error}
+        self.bulk_stats = stats
+
     def get_both_results(self):
         self.load_private_keys()
         return {'eth_keys_results': self.process_with_eth_keys(), 'web3_results': self.process_with_web3(), 'total_keys_processed': len(self.private_keys)}
 
 
-if __name__ == "__main__":
+def print_both_results():
     processor = EthereumKeysProcessor()
     results = processor.get_both_results()
 
@@ -70,4 +147,37 @@ if __name__ == "__main__":
         print(f"Private: {data['private_key']}")
         print(f"Public: {data['public_key']}")
         print(f"Address: {data['address']}")
-        print("-" * 50)
\ No newline at end of file
+        print("-" * 50)
+
+
+def run_bulk(args):
+    processor = EthereumKeysProcessor()
+    source = sys.stdin if args.bulk == '-' else open(args.bulk, 'r')
+    try:
+        for result in processor.process_bulk(source, args.workers, args.chunk_size, args.validate_sample):
+            if args.format == 'jsonl':
+                sys.stdout.write(json.dumps(result) + '\n')
+            else:
+                sys.stdout.write(f"{result['index']},{result['address'] or ''},{result['error'] or ''}\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    stats = processor.bulk_stats
+    print(f"Processed {stats['processed']} keys with {BACKEND}: {stats['errors']} errors, "
+          f"{stats['validated']} cross-validated, {stats['mismatches']} mismatches", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Derive Ethereum addresses from private keys")
+    parser.add_argument('--bulk', default=None, help="key file, one key per line ('-' for stdin)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--validate-sample', type=float, default=0.0, help="fraction of keys cross-checked with web3")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    args = parser.parse_args()
+
+    if args.bulk:
+        run_bulk(args)
+    else:
+        print_both_results()
@@ -14,106 +14,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import argparse
 import json
+import subprocess
 import sys
-import requests
-from web3 import Web3
-
-
-class AnvilManager:
-    def __init__(self, rpc_url="http://localhost:8545"):
-        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
-        self.rpc_url = rpc_url
-
-    def check_connection(self):
-        try:
-            return self.w3.is_connected()
-        except:
-            return False
-
-    def get_network_info(self):
-        if not self.check_connection():
-            return None
-
-        return {
-            'connected': True,
-            'chain_id': self.w3.eth.chain_id,
-            'block_number': self.w3.eth.block_number,
-            'gas_price': self.w3.eth.gas_price,
-            'accounts_count': len(self.w3.eth.accounts)
-        }
-
-    def get_wallets_info(self):
-        try:
-            with open('/app/config/wallets.json', 'r') as f:
-                wallets = json.load(f)
-        except:
-            return None
-
-        wallet_info = []
-        for wallet in wallets[:10]:
-            balance = self.w3.eth.get_balance(wallet['address'])
-            balance_eth = self.w3.from_wei(balance, 'ether')
-            wallet_info.append({
-                'address': wallet['address'],
-                'balance_eth': str(balance_eth),
-                'type': wallet['type']
-            })
-
-        return wallet_info
-
-    def mine_blocks(self, count=1):
-        for _ in range(count):
-            try:
-                response = requests.post(self.rpc_url, json={
-                    "jsonrpc": "2.0",
-                    "method": "evm_mine",
-                    "params": [],
-                    "id": 1
-                })
-                if response.status_code != 200:
-                    return False
-            except:
-                return False
-        return True
-
-    def set_block_time(self, seconds):
-        try:
-            response = requests.post(self.rpc_url, json={
-                "jsonrpc": "2.0",
-                "method": "evm_setIntervalMining",
-                "params": [seconds * 1000],
-                "id": 1
-            })
-            return response.status_code == 200
-        except:
-            return False
-
-    def snapshot(self):
-        try:
-            response = requests.post(self.rpc_url, json={
-                "jsonrpc": "2.0",
-                "method": "evm_snapshot",
-                "params": [],
-                "id": 1
-            })
-            if response.status_code == 200:
-                return response.json().get('result')
-        except:
-            pass
-        return None
-
-    def revert_snapshot(self, snapshot_id):
-        try:
-            response = requests.post(self.rpc_url, json={
-                "jsonrpc": "2.0",
-                "method": "evm_revert",
-                "params": [snapshot_id],
-                "id": 1
-            })
-            return response.status_code == 200
-        except:
-            return False
+from anvil_manager import AnvilManager, SnapshotPool
+from fleet_scanner import SORT_KEYS, format_json, format_table
 
 
 def main():
@@ -123,11 +29,14 @@ def main():
         print("Usage: python3 manage-anvil.py <command>")
         print("Commands:")
         print("  status - show network status")
-        print("  wallets - show wallet balances")
+        print("  wallets [--type T] [--sort KEY] [--limit N] [--code] [--json] - show wallet balances")
         print("  mine [count] - mine blocks")
         print("  blocktime <seconds> - set block time")
         print("  snapshot - create snapshot")
         print("  revert <snapshot_id> - revert to snapshot")
+        print("  pool checkpoint|revert|release <name> - named checkpoints, re-snapshotted after each revert")
+        print("  pool list - show checkpoints and revert latency")
+        print("  pool run <name> -- <command...> - run a command on the checkpoint state and revert afterwards")
         return
 
     command = sys.argv[1]
@@ -140,11 +49,21 @@ def main():
             print("Cannot connect to Anvil")
 
     elif command == "wallets":
-        wallets = manager.get_wallets_info()
+        parser = argparse.ArgumentParser(prog="manage-anvil.py wallets")
+        parser.add_argument('--type', dest='wallet_type', default=None)
+        parser.add_argument('--sort', dest='sort_by', choices=sorted(SORT_KEYS), default='balance')
+        parser.add_argument('--limit', type=int, default=None)
+        parser.add_argument('--code', action='store_true')
+        parser.add_argument('--json', action='store_true')
+        args = parser.parse_args(sys.argv[2:])
+
+        wallets = manager.get_wallets_info(args.wallet_type, args.limit, args.code, args.sort_by)
         if wallets:
-            print("Top 10 wallets:")
-            for wallet in wallets:
-                print(f"{wallet['address']}: {wallet['balance_eth']} ETH ({wallet['type']})")
+            if args.json:
+                print(format_json(wallets))
+            else:
+                print(format_table(wallets, args.code))
+                print(f"{len(wallets)} wallets")
         else:
             print("Cannot load wallet information")
 
@@ -182,9 +101,54 @@ def main():
         else:
             print("Failed to revert snapshot")
 
+    elif command == "pool":
+        run_pool_command(SnapshotPool(manager), sys.argv[2:])
+
     else:
         print(f"Unknown command: {command}")
 
 
+def run_pool_command(pool, args):
+    if not args or args[0] not in ("checkpoint", "revert", "release", "list", "run"):
+        print("Usage: pool checkpoint|revert|release|list|run ...")
+        return
+
+    action = args[0]
+    if action == "list":
+        print(json.dumps(pool.stats(), indent=2))
+        return
+
+    if len(args) < 2:
+        print(f"Usage: pool {action} <name>")
+        return
+    name = args[1]
+
+    try:
+        if action == "checkpoint":
+            print(f"Checkpoint {name}: {pool.checkpoint(name)}")
+
+        elif action == "revert":
+            elapsed_ms = pool.revert(name)
+            print(f"Reverted to {name} in {elapsed_ms:.1f} ms")
+
+        elif action == "release":
+            pool.release(name)
+            print(f"Released {name}")
+
+        elif action == "run":
+            command = args[3:] if len(args) > 2 and args[2] == "--" else args[2:]
+            if not command:
+                print("Usage: pool run <name> -- <command...>")
+                return
+            with pool.fresh(name):
+                returncode = subprocess.call(command)
+            print(f"Reverted to {name} in {pool.latency['last_ms']:.1f} ms")
+            sys.exit(returncode)
+
+    except (KeyError, RuntimeError) as e:
+        print(f"Snapshot pool error: {e}")
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from rpc_client import get_client
+
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', '/app/data/snapshots')
+RETENTION = int(os.getenv('SNAPSHOT_RETENTION', '10'))
+GZIP_MAGIC = b'\x1f\x8b'
+# anvil_dumpState/anvil_loadState для состояний в сотни МБ идут дольше RPC_TIMEOUT
+STATE_TIMEOUT = float(os.getenv('STATE_RPC_TIMEOUT', '600'))
+# История цепочки растёт только в конец: куски по CHUNK_ITEMS элементов,
+# кроме последнего, между снапшотами не меняются
+LIST_FIELDS = ('blocks', 'transactions')
+MAP_FIELDS = ('historical_states',)
+CHUNK_ITEMS = 256
+
+
+class SnapshotStore:
+    # Состояние разбивается на части: аккаунты по 256 корзинам по первому байту адреса,
+    # блоки и транзакции кусками по CHUNK_ITEMS, historical_states по корзинам от sha256
+    # ключа и небольшие метаданные. Каждая часть хранится сжатой под sha256 своего
+    # содержимого, поэтому неизменившиеся части между снапшотами не пишутся повторно.
+
+    def __init__(self, root=SNAPSHOT_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.catalog_path = os.path.join(root, 'catalog.json')
+        self.lock_path = os.path.join(root, '.lock')
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    @contextmanager
+    def locked(self):
+        # save и prune под одной блокировкой: сборка мусора не видит объекты
+        # снапшота, который ещё не попал в каталог
+        with open(self.lock_path, 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def load_catalog(self):
+        if not os.path.exists(self.catalog_path):
+            return []
+        with open(self.catalog_path, 'r') as f:
+            return json.load(f)
+
+    def save_catalog(self, catalog):
+        tmp_path = f"{self.catalog_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(catalog, f, indent=2)
+        os.replace(tmp_path, self.catalog_path)
+
+    def find(self, name):
+        for entry in self.load_catalog():
+            if entry['name'] == name:
+                return entry
+        return None
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, f"{digest}.json.gz")
+
+    def put_object(self, value):
+        data = json.dumps(value, sort_keys=True, separators=(',', ':')).encode()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=6))
+        os.replace(tmp_path, path)
+        return digest, os.path.getsize(path)
+
+    def get_object(self, digest):
+        with open(self._object_path(digest), 'rb') as f:
+            return json.loads(gzip.decompress(f.read()))
+
+    def save(self, name, state, metrics):
+        with self.locked():
+            return self._save(name, state, metrics)
+
+    def _save(self, name, state, metrics):
+        accounts = state.get('accounts') if isinstance(state.get('accounts'), dict) else None
+        lists = {key: state[key] for key in LIST_FIELDS if isinstance(state.get(key), list)}
+        maps = {key: state[key] for key in MAP_FIELDS if isinstance(state.get(key), dict)}
+        meta = {key: value for key, value in state.items()
+                if key not in lists and key not in maps and (accounts is None or key != 'accounts')}
+
+        buckets = {}
+        for address, account in (accounts or {}).items():
+            buckets.setdefault(address.lower()[2:4], {})[address] = account
+
+        written = 0
+        meta_digest, size = self.put_object(meta)
+        written += size
+        manifest = {'meta': meta_digest, 'accounts': None if accounts is None else {}, 'chunks': {}, 'buckets': {}}
+        for bucket, bucket_accounts in sorted(buckets.items()):
+            digest, size = self.put_object(bucket_accounts)
+            manifest['accounts'][bucket] = digest
+            written += size
+
+        for key, items in lists.items():
+            manifest['chunks'][key] = []
+            for start in range(0, len(items), CHUNK_ITEMS):
+                digest, size = self.put_object(items[start:start + CHUNK_ITEMS])
+                manifest['chunks'][key].append(digest)
+                written += size
+
+        for key, values in maps.items():
+            map_buckets = {}
+            for item_key, value in values.items():
+                map_buckets.setdefault(hashlib.sha256(item_key.encode()).hexdigest()[:2], {})[item_key] = value
+            manifest['buckets'][key] = {}
+            for bucket, bucket_values in sorted(map_buckets.items()):
+                digest, size = self.put_object(bucket_values)
+                manifest['buckets'][key][bucket] = digest
+                written += size
+
+        entry = {
+            'name': name,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'manifest': manifest,
+            'accounts': len(accounts or {}),
+            'written_bytes': written
+        }
+        entry.update(metrics)
+
+        catalog = [item for item in self.load_catalog() if item['name'] != name]
+        catalog.append(entry)
+        self.save_catalog(catalog)
+        return entry
+
+    def load_state(self, entry):
+        manifest = entry['manifest']
+        state = self.get_object(manifest['meta'])
+        if manifest['accounts'] is not None:
+            accounts = {}
+            for digest in manifest['accounts'].values():
+                accounts.update(self.get_object(digest))
+            state['accounts'] = accounts
+        for key, digests in manifest.get('chunks', {}).items():
+            state[key] = [item for digest in digests for item in self.get_object(digest)]
+        for key, buckets in manifest.get('buckets', {}).items():
+            values = {}
+            for digest in buckets.values():
+                values.update(self.get_object(digest))
+            state[key] = values
+        return state
+
+    def _referenced(self, entry):
+        manifest = entry['manifest']
+        digests = {manifest['meta']}
+        digests.update((manifest['accounts'] or {}).values())
+        for chunk_digests in manifest.get('chunks', {}).values():
+            digests.update(chunk_digests)
+        for buckets in manifest.get('buckets', {}).values():
+            digests.update(buckets.values())
+        return digests
+
+    def prune(self, retention=RETENTION):
+        with self.locked():
+            return self._prune(retention)
+
+    def _prune(self, retention):
+        catalog = self.load_catalog()
+        removed = catalog[:-retention] if retention > 0 and len(catalog) > retention else []
+        catalog = catalog[len(removed):]
+        self.save_catalog(catalog)
+
+        referenced = set()
+        for entry in catalog:
+            referenced.update(self._referenced(entry))
+
+        freed = 0
+        for filename in os.listdir(self.objects_dir):
+            digest = filename.split('.', 1)[0]
+            if digest not in referenced:
+                path = os.path.join(self.objects_dir, filename)
+                freed += os.path.getsize(path)
+                os.remove(path)
+        return removed, freed
+
+
+def rpc_call(method, params=None, timeout=None):
+    return get_client().request(method, params, timeout)
+
+
+def decode_dump(dump):
+    raw = bytes.fromhex(dump[2:] if dump.startswith('0x') else dump)
+    if raw[:2] == GZIP_MAGIC:
+        raw = gzip.decompress(raw)
+    return json.loads(raw), len(raw)
+
+
+def encode_state(state):
+    return '0x' + gzip.compress(json.dumps(state, separators=(',', ':')).encode(), compresslevel=1).hex()
+
+
+def format_size(size):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def backup(store, name=None):
+    name = name or f"snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    started = time.time()
+    dump = rpc_call("anvil_dumpState", timeout=STATE_TIMEOUT)
+    dump_seconds = time.time() - started
+
+    started = time.time()
+    state, raw_size = decode_dump(dump)
+    block_number = int(rpc_call("eth_blockNumber"), 16)
+    entry = store.save(name, state, {
+        'block_number': block_number,
+        'raw_bytes': raw_size,
+        'dump_seconds': round(dump_seconds, 3),
+        'store_seconds': round(time.time() - started, 3)
+    })
+    removed, freed = store.prune()
+
+    print(f"Snapshot created: {name}")
+    print(f"Block: {block_number}, accounts: {entry['accounts']}")
+    print(f"State size: {format_size(raw_size)}, new data written: {format_size(entry['written_bytes'])}")
+    print(f"Dump: {entry['dump_seconds']}s, store: {entry['store_seconds']}s")
+    if removed:
+        print(f"Pruned {len(removed)} old snapshots, freed {format_size(freed)}")
+
+
+def list_snapshots(store):
+    catalog = store.load_catalog()
+    if not catalog:
+        print("No snapshots found")
+        return
+    for entry in catalog:
+        print(f"{entry['name']}  block={entry.get('block_number')}  accounts={entry['accounts']}  "
+              f"size={format_size(entry.get('raw_bytes', 0))}  written={format_size(entry['written_bytes'])}  "
+              f"dump={entry.get('dump_seconds')}s  created={entry['created']}")
+
+
+def restore(store, name):
+    entry = store.find(name)
+    if entry is None:
+        print(f"Snapshot not found: {name}")
+        return False
+
+    started = time.time()
+    payload = encode_state(store.load_state(entry))
+    prepare_seconds = time.time() - started
+
+    started = time.time()
+    result = rpc_call("anvil_loadState", [payload], STATE_TIMEOUT)
+    load_seconds = time.time() - started
+
+    print(f"Restored snapshot: {name} (block {entry.get('block_number')})")
+    print(f"Prepare: {prepare_seconds:.3f}s, load: {load_seconds:.3f}s, payload: {format_size(len(payload) // 2)}")
+    return result is not False
+
+
+def materialize(store, name, output_path):
+    # Записывает снапшот в JSON для anvil --load-state при старте ноды
+    entry = store.find(name)
+    if entry is None:
+        print(f"Snapshot not found: {name}")
+        return False
+
+    started = time.time()
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(store.load_state(entry), f, separators=(',', ':'))
+    os.replace(tmp_path, output_path)
+    print(f"Snapshot {name} written to {output_path} ({format_size(os.path.getsize(output_path))}, {time.time() - started:.3f}s)")
+    return True
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 manage-persistence.py <command>")
+        print("Commands:")
+        print("  backup [name] - dump current state into a snapshot")
+        print("  list - list snapshots")
+        print("  restore <name> - load snapshot into the running node")
+        print("  materialize <name> [path] - write snapshot as a --load-state file")
+        print("  prune [keep] - drop old snapshots and unreferenced data")
+        return
+
+    command = sys.argv[1]
+    store = SnapshotStore()
+
+    if command == "backup":
+        backup(store, sys.argv[2] if len(sys.argv) > 2 else None)
+
+    elif command == "list":
+        list_snapshots(store)
+
+    elif command == "restore":
+        if len(sys.argv) < 3:
+            print("Usage: restore <name>")
+            return
+        if not restore(store, sys.argv[2]):
+            sys.exit(1)
+
+    elif command == "materialize":
+        if len(sys.argv) < 3:
+            print("Usage: materialize <name> [path]")
+            return
+        output_path = sys.argv[3] if len(sys.argv) > 3 else '/app/data/anvil-state.json'
+        if not materialize(store, sys.argv[2], output_path):
+            sys.exit(1)
+
+    elif command == "prune":
+        keep = int(sys.argv[2]) if len(sys.argv) > 2 else RETENTION
+        removed, freed = store.prune(keep)
+        print(f"Pruned {len(removed)} snapshots, freed {format_size(freed)}")
+
+    else:
+        print(f"Unknown command: {command}")
+
+
+if __name__ == "__main__":
+    main()
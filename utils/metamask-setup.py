@@ -15,15 +15,48 @@
 # limitations under the License.
 
 
+import argparse
+import itertools
 import json
+import os
 import sys
+from wallet_store import DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH, iter_json_array, iter_jsonl, open_store
+
+NETWORK_INFO = {
+    "rpc_url": "http://localhost:8545",
+    "chain_id": 31337,
+    "network_name": "Anvil Local Network"
+}
+
+
+def iter_wallets(source=None, wallet_type=None, offset=0, count=None):
+    # Без source кошельки читаются из wallets.db (фильтр и LIMIT/OFFSET в SQL),
+    # иначе потоком из JSON-массива или JSONL файла; чтение останавливается после count
+    if source is None:
+        if not os.path.exists(DEFAULT_STORE_PATH) and not os.path.exists(LEGACY_WALLETS_PATH):
+            return None
+
+        def from_store():
+            with open_store(DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH) as store:
+                yield from store.iter_wallets(wallet_type, offset, count)
+        return from_store()
+
+    if not os.path.exists(source):
+        return None
+    items = iter_jsonl(source) if source.endswith('.jsonl') else iter_json_array(source)
+    if wallet_type is not None:
+        items = (item for item in items if item.get('type') == wallet_type)
+    return itertools.islice(items, offset, None if count is None else offset + count)
+
+
+def load_wallets(count):
+    wallets = iter_wallets(count=count)
+    return list(wallets) if wallets is not None else None
 
 
 def generate_metamask_config():
-    try:
-        with open('/app/config/metamask-wallets.json', 'r') as f:
-            wallets = json.load(f)
-    except FileNotFoundError:
+    wallets = load_wallets(10)
+    if wallets is None:
         print("Wallets file not found. Run the container first.")
         return
 
@@ -58,14 +91,14 @@ await window.ethereum.request({
     }
 
     # Добавить первые 10 кошельков для демонстрации
-    for i, wallet in enumerate(wallets[:10]):
+    for i, wallet in enumerate(wallets):
         config["sample_wallets"].append({
             "wallet_number": i + 1,
             "address": wallet["address"],
             "private_key": wallet["private_key"],
-            "mnemonic": wallet["mnemonic"],
-            "balance_eth": wallet["balance_ether"],
-            "type": wallet["type"],
+            "mnemonic": wallet.get("mnemonic"),
+            "balance_eth": wallet.get("balance_ether"),
+            "type": wallet.get("type"),
             "import_instructions": {
                 "method_1_mnemonic": f"Import Account → Seed Phrase → {wallet['mnemonic']}",
                 "method_2_private_key": f"Import Account → Private Key → {wallet['private_key']}"
@@ -119,59 +152,71 @@ def print_quick_setup():
     return config
 
 
-def export_for_import(count=10):
-    try:
-        with open('/app/config/metamask-wallets.json', 'r') as f:
-            wallets = json.load(f)
-    except FileNotFoundError:
-        print("Wallets file not found")
-        return
-
-    export_data = {
-        "network_info": {
-            "rpc_url": "http://localhost:8545",
-            "chain_id": 31337,
-            "network_name": "Anvil Local Network"
-        },
-        "wallets_for_import": []
+def export_entry(number, wallet):
+    return {
+        "id": number,
+        "address": wallet["address"],
+        "private_key": wallet.get("private_key"),
+        "mnemonic": wallet.get("mnemonic"),
+        "balance": wallet.get("balance_ether"),
+        "type": wallet.get("type")
     }
 
-    for i, wallet in enumerate(wallets[:count]):
-        export_data["wallets_for_import"].append({
-            "id": i + 1,
-            "address": wallet["address"],
-            "private_key": wallet["private_key"],
-            "mnemonic": wallet["mnemonic"],
-            "balance": wallet["balance_ether"],
-            "type": wallet["type"]
-        })
 
-    with open('/app/config/metamask-import.json', 'w') as f:
-        json.dump(export_data, f, indent=2)
+def export_for_import(count=10, offset=0, wallet_type=None, source=None, output='/app/config/metamask-import.json', jsonl=False):
+    wallets = iter_wallets(source, wallet_type, offset, count)
+    if wallets is None:
+        print("Wallets file not found")
+        return
 
-    print(f"Created /app/config/metamask-import.json with {count} wallets")
+    # Кошельки пишутся по одному во временный файл, в памяти только текущий
+    tmp_path = f"{output}.tmp"
+    written = 0
+    with open(tmp_path, 'w') as f:
+        if not jsonl:
+            f.write('{\n  "network_info": ' + json.dumps(NETWORK_INFO) + ',\n  "wallets_for_import": [')
+        for wallet in wallets:
+            entry = json.dumps(export_entry(offset + written + 1, wallet))
+            if jsonl:
+                f.write(entry + '\n')
+            else:
+                f.write(('\n    ' if written == 0 else ',\n    ') + entry)
+            written += 1
+        if not jsonl:
+            f.write('\n  ]\n}\n' if written else ']\n}\n')
+    os.replace(tmp_path, output)
+
+    print(f"Created {output} with {written} wallets")
 
 
 def main():
     if len(sys.argv) < 2:
         print("Usage: python3 metamask-setup.py <command>")
         print("Commands:")
-        print("  setup - show MetaMask setup instructions")
-        print("  export [count] - export wallets for import (default: 10)")
+        print("  setup [--save] - show MetaMask setup instructions (--save writes metamask-config.json)")
+        print("  export [count] [--offset N] [--type T] [--source FILE] [--output FILE] [--jsonl]")
+        print("         - export wallets for import (default: 10, 0 - all)")
         return
 
     command = sys.argv[1]
 
     if command == "setup":
         config = print_quick_setup()
-        if config:
+        if config and "--save" in sys.argv[2:]:
             with open('/app/config/metamask-config.json', 'w') as f:
                 json.dump(config, f, indent=2)
-            print(f"\nFull configuration saved to: /app/config/metamask-config.json")
+            print("\nConfiguration saved to: /app/config/metamask-config.json")
 
     elif command == "export":
-        count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
-        export_for_import(count)
+        parser = argparse.ArgumentParser(prog="metamask-setup.py export")
+        parser.add_argument('count', nargs='?', type=int, default=10)
+        parser.add_argument('--offset', type=int, default=0)
+        parser.add_argument('--type', dest='wallet_type', default=None)
+        parser.add_argument('--source', default=None, help="JSON array or .jsonl wallet file instead of wallets.db")
+        parser.add_argument('--output', default='/app/config/metamask-import.json')
+        parser.add_argument('--jsonl', action='store_true', help="write one wallet per line")
+        args = parser.parse_args(sys.argv[2:])
+        export_for_import(args.count or None, args.offset, args.wallet_type, args.source, args.output, args.jsonl)
 
     else:
         print(f"Unknown command: {command}")
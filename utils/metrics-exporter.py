@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import os
+import threading
+import time
+from prometheus_client import Gauge, Histogram, start_http_server
+from anvil_manager import AnvilManager
+from fleet_scanner import scan_fleet
+from wallet_store import DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH, open_store
+
+STATE_FILE = '/app/data/anvil-state.json'
+SNAPSHOT_DIR = '/app/data/snapshots'
+
+UP = Gauge('anvil_up', 'Whether the node answered the last sample')
+BLOCK_HEIGHT = Gauge('anvil_block_height', 'Latest block number')
+BLOCK_RATE = Gauge('anvil_block_rate', 'Blocks per second over the last sample interval')
+CHAIN_ID = Gauge('anvil_chain_id', 'Chain id')
+GAS_PRICE = Gauge('anvil_gas_price_wei', 'Current gas price')
+TXPOOL = Gauge('anvil_txpool_transactions', 'Transactions in the txpool', ['state'])
+BLOCK_GAS_USED = Gauge('anvil_block_gas_used', 'Gas used by the latest block')
+BLOCK_GAS_LIMIT = Gauge('anvil_block_gas_limit', 'Gas limit of the latest block')
+BLOCK_TXS = Gauge('anvil_block_transactions', 'Transactions in the latest block')
+BLOCK_GAS_USED_HISTOGRAM = Histogram('anvil_block_gas_used_distribution', 'Gas used per new block',
+                                     buckets=[21000, 100000, 500000, 1e6, 5e6, 10e6, 15e6, 20e6, 30e6])
+RPC_LATENCY = Histogram('anvil_rpc_latency_seconds', 'Latency of sampling RPC requests', ['request'],
+                        buckets=[0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5])
+STATE_FILE_BYTES = Gauge('anvil_state_file_bytes', 'Size of persisted state data', ['kind'])
+FLEET_WALLETS = Gauge('anvil_fleet_wallets', 'Wallets in the fleet', ['type'])
+FLEET_BALANCE = Gauge('anvil_fleet_balance_wei', 'Total fleet balance', ['type'])
+FLEET_MIN_BALANCE = Gauge('anvil_fleet_min_balance_wei', 'Lowest wallet balance', ['type'])
+FLEET_SCAN_SECONDS = Gauge('anvil_fleet_scan_seconds', 'Duration of the last fleet balance scan')
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for filename in files:
+            try:
+                total += os.path.getsize(os.path.join(root, filename))
+            except OSError:
+                pass
+    return total
+
+
+class Exporter:
+    def __init__(self, manager, interval, fleet_interval):
+        self.manager = manager
+        self.interval = interval
+        self.fleet_interval = fleet_interval
+        self.last_block = None
+        self.last_sample_at = None
+
+    def sample_node(self):
+        started = time.perf_counter()
+        info = self.manager.get_network_info()
+        RPC_LATENCY.labels('network_info').observe(time.perf_counter() - started)
+        if info is None:
+            UP.set(0)
+            return
+
+        UP.set(1)
+        now = time.time()
+        block_number = info['block_number']
+        CHAIN_ID.set(info['chain_id'])
+        BLOCK_HEIGHT.set(block_number)
+        if info['gas_price'] is not None:
+            GAS_PRICE.set(info['gas_price'])
+
+        calls = [("txpool_status", []), ("eth_getBlockByNumber", ["latest", False])]
+        if self.last_block is not None and block_number > self.last_block:
+            # Газ всех новых блоков с прошлой выборки, но не больше 100 за раз
+            first = max(self.last_block + 1, block_number - 99)
+            calls += [("eth_getBlockByNumber", [hex(number), False]) for number in range(first, block_number)]
+
+        started = time.perf_counter()
+        results = self.manager.batch_call(calls)
+        RPC_LATENCY.labels('txpool_blocks').observe(time.perf_counter() - started)
+
+        txpool, latest = results[0], results[1]
+        if txpool['error'] is None:
+            for state in ('pending', 'queued'):
+                TXPOOL.labels(state).set(int(txpool['result'].get(state, '0x0'), 16))
+
+        if latest['error'] is None and latest['result']:
+            block = latest['result']
+            BLOCK_GAS_USED.set(int(block['gasUsed'], 16))
+            BLOCK_GAS_LIMIT.set(int(block['gasLimit'], 16))
+            BLOCK_TXS.set(len(block['transactions']))
+
+        if self.last_block is not None and block_number > self.last_block:
+            for result in results[2:] + [latest]:
+                if result['error'] is None and result['result']:
+                    BLOCK_GAS_USED_HISTOGRAM.observe(int(result['result']['gasUsed'], 16))
+
+        if self.last_block is not None and now > self.last_sample_at:
+            BLOCK_RATE.set(max(block_number - self.last_block, 0) / (now - self.last_sample_at))
+        self.last_block = block_number
+        self.last_sample_at = now
+
+    def sample_state_files(self):
+        STATE_FILE_BYTES.labels('state').set(os.path.getsize(STATE_FILE) if os.path.exists(STATE_FILE) else 0)
+        STATE_FILE_BYTES.labels('snapshots').set(directory_size(SNAPSHOT_DIR))
+
+    def sample_fleet(self):
+        if not os.path.exists(DEFAULT_STORE_PATH) and not os.path.exists(LEGACY_WALLETS_PATH):
+            return
+        started = time.perf_counter()
+        with open_store(DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH) as store:
+            rows = scan_fleet(self.manager.rpc_url, store.iter_wallets())
+        FLEET_SCAN_SECONDS.set(time.perf_counter() - started)
+
+        totals = {}
+        for row in rows:
+            if row['balance_wei'] is None:
+                continue
+            entry = totals.setdefault(row['type'] or 'unknown', {'count': 0, 'total': 0, 'min': None})
+            entry['count'] += 1
+            entry['total'] += row['balance_wei']
+            entry['min'] = row['balance_wei'] if entry['min'] is None else min(entry['min'], row['balance_wei'])
+
+        for wallet_type, entry in totals.items():
+            FLEET_WALLETS.labels(wallet_type).set(entry['count'])
+            FLEET_BALANCE.labels(wallet_type).set(entry['total'])
+            FLEET_MIN_BALANCE.labels(wallet_type).set(entry['min'])
+
+    def fleet_loop(self):
+        # Скан флота идёт в своём потоке и не задерживает секундные выборки узла
+        while True:
+            started = time.monotonic()
+            try:
+                self.sample_fleet()
+            except Exception as e:
+                print(f"Fleet scan error: {e}")
+            time.sleep(max(self.fleet_interval - (time.monotonic() - started), 0))
+
+    def run(self):
+        if self.fleet_interval > 0:
+            threading.Thread(target=self.fleet_loop, daemon=True).start()
+        while True:
+            started = time.monotonic()
+            try:
+                self.sample_node()
+                self.sample_state_files()
+            except Exception as e:
+                UP.set(0)
+                print(f"Sampling error: {e}")
+            time.sleep(max(self.interval - (time.monotonic() - started), 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prometheus exporter for the Anvil node and wallet fleet")
+    parser.add_argument('--port', type=int, default=int(os.getenv('METRICS_PORT', '9545')))
+    parser.add_argument('--interval', type=float, default=1.0, help="node sampling interval, seconds")
+    parser.add_argument('--fleet-interval', type=float, default=30.0, help="fleet balance scan interval, 0 disables")
+    parser.add_argument('--rpc-url', default=None)
+    args = parser.parse_args()
+
+    start_http_server(args.port)
+    print(f"Serving metrics on :{args.port}/metrics")
+    Exporter(AnvilManager(args.rpc_url), args.interval, args.fleet_interval).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import random
+import time
+from rpc_client import RpcClient, resolve_endpoint
+
+DEADLINE = float(os.getenv('READY_DEADLINE', '60'))
+# Адрес для проверки загрузки состояния: у Genesis аккаунта ненулевой баланс
+STATE_ADDRESS = os.getenv('GENESIS_ACCOUNT') or os.getenv('GENESIS_ACCOUNT_ADDRESS')
+INITIAL_DELAY = 0.05
+MAX_DELAY = 2.0
+PROBE_TIMEOUT = 2.0
+
+
+def probe(client, chain_id=None, address=None):
+    # Нода готова, когда отвечает eth_blockNumber, chain id совпадает с ожидаемым
+    # и (если задан адрес) состояние загружено - у адреса ненулевой баланс
+    calls = [("eth_blockNumber", []), ("eth_chainId", [])]
+    if address:
+        calls.append(("eth_getBalance", [address, "latest"]))
+    results = client.batch_call(calls)
+
+    if results[0]['error'] is not None:
+        return False, f"eth_blockNumber: {results[0]['error']}"
+    if chain_id is not None and (results[1]['error'] is not None or int(results[1]['result'], 16) != chain_id):
+        return False, f"chain id {results[1]['result'] or results[1]['error']}, expected {chain_id}"
+    if address:
+        if results[2]['error'] is not None:
+            return False, f"eth_getBalance: {results[2]['error']}"
+        if int(results[2]['result'], 16) == 0:
+            return False, f"state not loaded: {address} has zero balance"
+    return True, f"block {int(results[0]['result'], 16)}"
+
+
+def wait_until_ready(endpoint=None, deadline=DEADLINE, chain_id=None, address=STATE_ADDRESS, log=None):
+    # Экспоненциальная задержка с полным jitter между попытками, общий дедлайн.
+    # Возвращает {'ready', 'elapsed', 'attempts', 'detail'}
+    client = RpcClient(endpoint or resolve_endpoint(), timeout=PROBE_TIMEOUT, retries=0)
+    started = time.monotonic()
+    delay = INITIAL_DELAY
+    attempts = 0
+
+    while True:
+        attempts += 1
+        ready, detail = probe(client, chain_id, address)
+        elapsed = time.monotonic() - started
+        if ready:
+            return {'ready': True, 'elapsed': elapsed, 'attempts': attempts, 'detail': detail}
+
+        remaining = deadline - elapsed
+        if remaining <= 0:
+            return {'ready': False, 'elapsed': elapsed, 'attempts': attempts, 'detail': detail}
+        if log:
+            log(f"Not ready ({detail}), attempt {attempts}")
+        time.sleep(min(random.uniform(0, delay), remaining))
+        delay = min(delay * 2, MAX_DELAY)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import os
+import time
+from decimal import Decimal
+from anvil_manager import AnvilManager
+from chain_cache import get_chain_cache
+from confirmations import ConfirmationTracker, NonceSender
+from fleet_scanner import scan_fleet
+from wallet_store import DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH, TIER_BALANCES, open_store
+
+TRANSFER_GAS = 21000
+
+
+def parse_targets(values):
+    # --target high=1.5 (ETH) переопределяет целевой баланс уровня
+    targets = dict(TIER_BALANCES)
+    for value in values or []:
+        tier, ether = value.split('=', 1)
+        targets[tier] = int(Decimal(ether) * 10 ** 18)
+    return targets
+
+
+def record_targets(wallets, targets, pinned, stored):
+    # Сохранённый баланс кошелька важнее цели уровня, если уровень не задан явно через --target;
+    # запоминаются только отличия от цели уровня, чтобы не держать весь флот в памяти
+    for wallet in wallets:
+        balance = wallet.get('balance')
+        if balance not in (None, '') and wallet.get('type') not in pinned:
+            target = int(balance)
+            if target != targets.get(wallet.get('type')):
+                stored[wallet['address'].lower()] = target
+        yield wallet
+
+
+def plan_topups(rows, targets, low_watermark, refill_to, stored=None):
+    # Гистерезис: пополняются только кошельки ниже low_watermark * target,
+    # и сразу до refill_to * target, чтобы не пополнять их на каждом проходе
+    stored = stored or {}
+    topups = []
+    summary = {}
+    for row in rows:
+        target = stored.get(row['address'].lower(), targets.get(row['type']))
+        entry = summary.setdefault(row['type'], {'wallets': 0, 'below': 0, 'deficit_wei': 0, 'errors': 0})
+        entry['wallets'] += 1
+        if row['balance_wei'] is None:
+            entry['errors'] += 1
+            continue
+        if target is None or row['balance_wei'] >= target * low_watermark:
+            continue
+        refill = int(target * refill_to)
+        entry['below'] += 1
+        entry['deficit_wei'] += refill - row['balance_wei']
+        topups.append({'address': row['address'], 'balance': row['balance_wei'], 'refill': refill})
+    return topups, summary
+
+
+class Rebalancer:
+    def __init__(self, manager, mode, funder_key=None):
+        self.manager = manager
+        self.mode = mode
+        self.funder_key = funder_key
+        self.tracker = ConfirmationTracker(manager.client) if mode == 'transfer' else None
+
+    def apply(self, topups):
+        if not topups:
+            return 0, []
+        if self.mode == 'setbalance':
+            errors = self.manager.set_balances([(item['address'], item['refill']) for item in topups])
+            return sum(1 for error in errors if error is None), [error for error in errors if error]
+        return self.transfer(topups)
+
+    def transfer(self, topups):
+        # Переводы недостающей суммы с последовательными nonce одним пакетом;
+        # после отказа узла NonceSender переподписывает остаток со сдвигом nonce
+        client = self.manager.client
+        fee_fields = get_chain_cache(client).tx_fields()
+        items = NonceSender(client, self.funder_key).send([
+            dict(fee_fields, to=item['address'], value=item['refill'] - item['balance'], gas=TRANSFER_GAS) for item in topups
+        ])
+        sent = [item['tx_hash'] for item in items if item['status'] == 'sent']
+        errors = [item['error'] for item in items if item['status'] != 'sent']
+        if errors:
+            get_chain_cache(client).invalidate_fees()
+
+        receipts = self.tracker.wait(sent, timeout=120) if sent else {}
+        confirmed = sum(1 for tx_hash in sent if (receipts.get(tx_hash) or {}).get('status') == 1)
+        return confirmed, errors
+
+
+def iter_fleet(args):
+    if args.fleet:
+        from deterministic_fleet import DeterministicFleet
+        fleet = DeterministicFleet(args.fleet)
+        return fleet, fleet.iter_wallets(args.type)
+    store = open_store(args.store, LEGACY_WALLETS_PATH)
+    return store, store.iter_wallets(args.type)
+
+
+def run_pass(args, manager, rebalancer, targets, pinned):
+    started = time.time()
+    source, wallets = iter_fleet(args)
+    stored = {}
+    try:
+        rows = scan_fleet(manager.rpc_url, record_targets(wallets, targets, pinned, stored))
+    finally:
+        source.close()
+    scanned_at = time.time()
+
+    topups, summary = plan_topups(rows, targets, args.low_watermark, args.refill_to, stored)
+    applied, errors = (0, []) if args.dry_run else rebalancer.apply(topups)
+
+    for tier, entry in sorted(summary.items(), key=lambda item: str(item[0])):
+        print(f"{tier}: {entry['wallets']} wallets, {entry['below']} below threshold, "
+              f"deficit {Decimal(entry['deficit_wei']) / 10 ** 18} ETH, {entry['errors']} scan errors")
+    print(f"Scanned {len(rows)} wallets in {scanned_at - started:.2f}s, "
+          f"topped up {applied}/{len(topups)} in {time.time() - scanned_at:.2f}s")
+    for error in errors[:3]:
+        print(f"Top-up error: {error}")
+    return len(topups), applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep fleet wallet tiers topped up")
+    parser.add_argument('--mode', choices=['setbalance', 'transfer'], default=os.getenv('REBALANCE_MODE', 'setbalance'))
+    parser.add_argument('--interval', type=float, default=60.0, help="seconds between passes")
+    parser.add_argument('--once', action='store_true', help="run a single pass and exit")
+    parser.add_argument('--dry-run', action='store_true', help="report deficits without topping up")
+    parser.add_argument('--low-watermark', type=float, default=0.5, help="top up wallets below this fraction of the target")
+    parser.add_argument('--refill-to', type=float, default=1.0, help="top up to this fraction of the target")
+    parser.add_argument('--target', action='append', help="tier target override, e.g. high=1.0 (ETH)")
+    parser.add_argument('--type', default=None, help="only this wallet type")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH)
+    parser.add_argument('--fleet', default=None, help="deterministic fleet manifest instead of the wallet store")
+    parser.add_argument('--rpc-url', default=None)
+    args = parser.parse_args()
+
+    if args.refill_to < args.low_watermark:
+        parser.error("--refill-to must not be below --low-watermark")
+
+    funder_key = os.getenv('GENESIS_PRIVATE_KEY')
+    if args.mode == 'transfer' and not funder_key:
+        parser.error("transfer mode needs GENESIS_PRIVATE_KEY")
+
+    manager = AnvilManager(args.rpc_url)
+    rebalancer = Rebalancer(manager, args.mode, funder_key)
+    targets = parse_targets(args.target)
+    pinned = {value.split('=', 1)[0] for value in args.target or []}
+
+    while True:
+        started = time.monotonic()
+        try:
+            run_pass(args, manager, rebalancer, targets, pinned)
+        except Exception as e:
+            print(f"Rebalance pass failed: {e}")
+        if args.once:
+            break
+        time.sleep(max(args.interval - (time.monotonic() - started), 0))
+
+
+if __name__ == "__main__":
+    main()
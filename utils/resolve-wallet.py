@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import json
+import sys
+from deterministic_fleet import DEFAULT_MANIFEST_PATH, DeterministicFleet
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve wallets of a deterministic fleet")
+    parser.add_argument('wallets', nargs='+', help="wallet indexes, index ranges (N-M) or addresses")
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST_PATH)
+    parser.add_argument('--no-keys', action='store_true', help="print addresses only")
+    args = parser.parse_args()
+
+    with DeterministicFleet(args.manifest) as fleet:
+        for value in args.wallets:
+            if value.startswith('0x'):
+                index = fleet.index_of(value)
+                if index is None:
+                    print(f"Address not in fleet: {value}", file=sys.stderr)
+                    continue
+                indexes = [index]
+            elif '-' in value:
+                start, stop = value.split('-', 1)
+                indexes = range(int(start), int(stop) + 1)
+            else:
+                indexes = [int(value)]
+
+            for index in indexes:
+                try:
+                    print(json.dumps(fleet.wallet(index, not args.no_keys)))
+                except IndexError as e:
+                    print(str(e), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import os
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from web3 import Web3
+from rpc_metrics import get_metrics, metrics_middleware
+
+DEFAULT_RPC_URL = 'http://localhost:8545'
+BATCH_SIZE = 500
+TIMEOUT = float(os.getenv('RPC_TIMEOUT', '30'))
+RETRIES = int(os.getenv('RPC_RETRIES', '3'))
+POOL_SIZE = int(os.getenv('RPC_POOL_SIZE', '16'))
+RETRY_STATUSES = (502, 503, 504)
+# Повтор по 5xx безопасен только для чтений: отправка могла дойти до узла
+READ_METHODS = ('eth_get', 'eth_call', 'eth_blockNumber', 'eth_chainId', 'eth_estimateGas', 'eth_feeHistory',
+                'eth_gasPrice', 'eth_maxPriorityFeePerGas', 'eth_syncing', 'net_', 'web3_', 'txpool_')
+
+_clients = {}
+
+
+class RpcError(Exception):
+    def __init__(self, method, message):
+        super().__init__(f"{method}: {message}")
+        self.method = method
+        self.message = message
+
+
+def resolve_endpoint(default=DEFAULT_RPC_URL):
+    return os.getenv('ANVIL_RPC_URL') or default
+
+
+class RpcClient:
+    # Общий JSON-RPC клиент для всех утилит: keep-alive пул соединений, повторы
+    # при ошибках соединения, таймауты и пакетные вызовы. HTTP(S), WebSocket
+    # (ws://, wss://) и IPC (путь к сокету) выбираются по виду endpoint.
+
+    def __init__(self, endpoint=None, timeout=TIMEOUT, retries=RETRIES, pool_size=POOL_SIZE, batch_size=BATCH_SIZE):
+        self.endpoint = endpoint or resolve_endpoint()
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.retries = retries
+        self.is_http = self.endpoint.startswith(('http://', 'https://'))
+        self._request_ids = itertools.count(1)
+        self._web3 = None
+        self.session = None
+        self.metrics = get_metrics()
+
+        if self.is_http:
+            # Адаптер повторяет только неудавшиеся соединения; повторы по статусу - в _post
+            retry = Retry(total=retries, connect=retries, read=0, status=0, backoff_factor=0.2,
+                          allowed_methods=frozenset(['POST']))
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+            self.session = requests.Session()
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+
+    @property
+    def web3(self):
+        if self._web3 is None:
+            if self.is_http:
+                provider = Web3.HTTPProvider(self.endpoint, request_kwargs={'timeout': self.timeout}, session=self.session)
+            elif self.endpoint.startswith(('ws://', 'wss://')):
+                provider = Web3.WebsocketProvider(self.endpoint, websocket_timeout=self.timeout)
+            else:
+                provider = Web3.IPCProvider(self.endpoint, timeout=self.timeout)
+            self._web3 = Web3(provider)
+            if self.metrics is not None:
+                self._web3.middleware_onion.add(metrics_middleware, 'rpc_metrics')
+        return self._web3
+
+    def _post(self, payload, timeout=None, retries=0):
+        for attempt in range(retries + 1):
+            response = self.session.post(self.endpoint, json=payload, timeout=timeout or self.timeout)
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                break
+            time.sleep(0.2 * 2 ** attempt)
+        response.raise_for_status()
+        return response.json(), len(response.request.body or b''), len(response.content)
+
+    def batch_call(self, calls, timeout=None):
+        # calls - список пар (method, params). Вызовы отправляются JSON-RPC массивами
+        # по batch_size штук, ответы сопоставляются по id и возвращаются в исходном
+        # порядке как {'result': ..., 'error': ...} для каждого вызова. При ошибке
+        # транспорта (таймаут, обрыв, нет ответа) добавляется 'transport': True -
+        # узел мог выполнить вызов, в отличие от отказа JSON-RPC.
+        if not self.is_http:
+            return [self._provider_call(method, params) for method, params in calls]
+
+        results = []
+        for start in range(0, len(calls), self.batch_size):
+            chunk = calls[start:start + self.batch_size]
+            request_ids = []
+            payload = []
+            for method, params in chunk:
+                request_id = next(self._request_ids)
+                request_ids.append(request_id)
+                payload.append({
+                    "jsonrpc": "2.0",
+                    "method": method,
+                    "params": params,
+                    "id": request_id
+                })
+
+            started = time.perf_counter()
+            try:
+                read_only = all(method.startswith(READ_METHODS) for method, _ in chunk)
+                body, bytes_out, bytes_in = self._post(payload, timeout, self.retries if read_only else 0)
+            except Exception as e:
+                if self.metrics is not None:
+                    self.metrics.record([method for method, _ in chunk], time.perf_counter() - started, failed=True)
+                results.extend({'result': None, 'error': str(e), 'transport': True} for _ in chunk)
+                continue
+            elapsed = time.perf_counter() - started
+
+            if not isinstance(body, list):
+                if self.metrics is not None:
+                    self.metrics.record([method for method, _ in chunk], elapsed, bytes_out, bytes_in, failed=True)
+                error = body.get('error', {}).get('message', 'invalid batch response')
+                results.extend({'result': None, 'error': error, 'transport': True} for _ in chunk)
+                continue
+
+            responses = {item.get('id'): item for item in body}
+            failed_methods = []
+            for (method, _), request_id in zip(chunk, request_ids):
+                item = responses.get(request_id)
+                if item is None:
+                    failed_methods.append(method)
+                    results.append({'result': None, 'error': 'missing response', 'transport': True})
+                elif item.get('error') is not None:
+                    failed_methods.append(method)
+                    results.append({'result': None, 'error': item['error'].get('message', str(item['error']))})
+                else:
+                    results.append({'result': item.get('result'), 'error': None})
+            if self.metrics is not None:
+                self.metrics.record([method for method, _ in chunk], elapsed, bytes_out, bytes_in, failed_methods)
+        return results
+
+    def _provider_call(self, method, params):
+        started = time.perf_counter()
+        try:
+            response = self.web3.provider.make_request(method, params)
+        except Exception as e:
+            if self.metrics is not None:
+                self.metrics.record([method], time.perf_counter() - started, failed=True)
+            return {'result': None, 'error': str(e), 'transport': True}
+        if self.metrics is not None:
+            errors = [method] if response.get('error') is not None else None
+            self.metrics.record([method], time.perf_counter() - started, errors=errors)
+        if response.get('error') is not None:
+            return {'result': None, 'error': response['error'].get('message', str(response['error']))}
+        return {'result': response.get('result'), 'error': None}
+
+    def call(self, method, params=None, timeout=None):
+        # timeout переопределяет RPC_TIMEOUT для долгих вызовов (только HTTP)
+        return self.batch_call([(method, params or [])], timeout)[0]
+
+    def request(self, method, params=None, timeout=None):
+        result = self.call(method, params, timeout)
+        if result['error'] is not None:
+            raise RpcError(method, result['error'])
+        return result['result']
+
+
+def get_client(endpoint=None):
+    # Один клиент (и один пул соединений) на endpoint в пределах процесса
+    endpoint = endpoint or resolve_endpoint()
+    if endpoint not in _clients:
+        _clients[endpoint] = RpcClient(endpoint)
+    return _clients[endpoint]
@@ -0,0 +1,159 @@
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+# Включается через RPC_METRICS=1 (сводка в stderr при выходе) и/или
+# RPC_METRICS_FILE=path (сводка в JSON, {pid} в пути заменяется на pid процесса)
+ENABLED = os.getenv('RPC_METRICS', '0') == '1' or bool(os.getenv('RPC_METRICS_FILE'))
+METRICS_FILE = os.getenv('RPC_METRICS_FILE')
+LATENCY_BUCKETS_MS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+_metrics = None
+
+
+class RpcMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.methods = {}
+        self.requests = {}
+
+    def _method(self, method):
+        return self.methods.setdefault(method, {'calls': 0, 'errors': 0})
+
+    def _request(self, label):
+        return self.requests.setdefault(label, {
+            'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'bytes_out': 0, 'bytes_in': 0, 'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        })
+
+    def record(self, methods, seconds, bytes_out=0, bytes_in=0, errors=None, failed=False):
+        # Один HTTP запрос (одиночный вызов или пакет): methods - методы в нём,
+        # errors - список методов, вернувших ошибку
+        if len(methods) == 1:
+            label = methods[0]
+        else:
+            distinct = set(methods)
+            label = f"batch:{methods[0]}" if len(distinct) == 1 else "batch:mixed"
+        elapsed_ms = seconds * 1000
+
+        with self.lock:
+            for method in methods:
+                self._method(method)['calls'] += 1
+                if failed:
+                    self._method(method)['errors'] += 1
+            for method in errors or []:
+                self._method(method)['errors'] += 1
+
+            entry = self._request(label)
+            entry['count'] += 1
+            entry['errors'] += 1 if failed else 0
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['bytes_out'] += bytes_out
+            entry['bytes_in'] += bytes_in
+            for position, bound in enumerate(LATENCY_BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    entry['buckets'][position] += 1
+                    break
+            else:
+                entry['buckets'][-1] += 1
+
+    def summary(self):
+        with self.lock:
+            requests = {}
+            for label, entry in self.requests.items():
+                histogram = {f"le_{bound}ms": count for bound, count in zip(LATENCY_BUCKETS_MS, entry['buckets'])}
+                histogram['le_inf'] = entry['buckets'][-1]
+                requests[label] = {
+                    'count': entry['count'],
+                    'errors': entry['errors'],
+                    'avg_ms': round(entry['total_ms'] / entry['count'], 3) if entry['count'] else 0,
+                    'max_ms': round(entry['max_ms'], 3),
+                    'total_ms': round(entry['total_ms'], 3),
+                    'bytes_out': entry['bytes_out'],
+                    'bytes_in': entry['bytes_in'],
+                    'latency_histogram': histogram
+                }
+            return {
+                'pid': os.getpid(),
+                'script': os.path.basename(sys.argv[0]) if sys.argv else None,
+                'duration_seconds': round(time.time() - self.started_at, 3),
+                'methods': {method: dict(entry) for method, entry in self.methods.items()},
+                'requests': requests
+            }
+
+    def format_summary(self, summary):
+        lines = [f"RPC metrics ({summary['script']}, {summary['duration_seconds']}s)"]
+        lines.append(f"{'Method':<32} {'Calls':>8} {'Errors':>7}")
+        for method, entry in sorted(summary['methods'].items(), key=lambda item: -item[1]['calls']):
+            lines.append(f"{method:<32} {entry['calls']:>8} {entry['errors']:>7}")
+        lines.append(f"{'Request':<32} {'Count':>8} {'Avg ms':>9} {'Max ms':>9} {'Total ms':>11} {'Out':>10} {'In':>10}")
+        for label, entry in sorted(summary['requests'].items(), key=lambda item: -item[1]['total_ms']):
+            lines.append(f"{label:<32} {entry['count']:>8} {entry['avg_ms']:>9.2f} {entry['max_ms']:>9.2f} "
+                         f"{entry['total_ms']:>11.1f} {entry['bytes_out']:>10} {entry['bytes_in']:>10}")
+        return "\n".join(lines)
+
+    def dump(self):
+        summary = self.summary()
+        if not summary['methods']:
+            return
+        if METRICS_FILE:
+            path = METRICS_FILE.replace('{pid}', str(summary['pid']))
+            with open(path, 'w') as f:
+                json.dump(summary, f, indent=2)
+        if os.getenv('RPC_METRICS', '0') == '1':
+            print(self.format_summary(summary), file=sys.stderr)
+
+
+def get_metrics():
+    # None, если инструментирование выключено: вызывающий код проверяет это один раз
+    global _metrics
+    if not ENABLED:
+        return None
+    if _metrics is None:
+        _metrics = RpcMetrics()
+        atexit.register(_metrics.dump)
+    return _metrics
+
+
+def _payload_size(value):
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def metrics_middleware(make_request, w3):
+    # web3 middleware: учитывает вызовы, сделанные через w3.eth.*
+    metrics = get_metrics()
+
+    def middleware(method, params):
+        started = time.perf_counter()
+        try:
+            response = make_request(method, params)
+        except Exception:
+            metrics.record([method], time.perf_counter() - started, _payload_size(params), failed=True)
+            raise
+        errors = [method] if isinstance(response, dict) and response.get('error') is not None else None
+        metrics.record([method], time.perf_counter() - started, _payload_size(params), _payload_size(response), errors)
+        return response
+
+    return middleware
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+from eth_abi import encode
+from eth_account import Account
+from eth_utils import keccak
+from anvil_manager import AnvilManager, SnapshotPool
+from chain_cache import get_chain_cache
+from confirmations import ConfirmationTracker, NonceSender
+from rpc_client import RpcError
+from wallet_store import DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH, open_store
+
+RESULT_PATH = '/app/data/seed-result.json'
+SLOT_PROBE_LIMIT = 32
+PROBE_ADDRESS = '0x' + '5eed' * 10
+VERIFY_SAMPLE = 5
+
+BALANCE_OF = '0x70a08231'
+TRANSFER = 'a9059cbb'
+MINT = '40c10f19'
+
+
+def word(value):
+    return '0x' + int(value).to_bytes(32, 'big').hex()
+
+
+def address_word(address):
+    return bytes(12) + bytes.fromhex(address[2:])
+
+
+def balance_key(holder, slot):
+    # Слот mapping(address => uint256) по Solidity: keccak(pad(holder) . pad(slot))
+    return '0x' + keccak(address_word(holder) + int(slot).to_bytes(32, 'big')).hex()
+
+
+def load_artifact(path):
+    # Foundry (bytecode.object), Hardhat (bytecode) или просто {"abi", "bytecode"}
+    with open(path, 'r') as f:
+        artifact = json.load(f)
+    bytecode = artifact.get('bytecode')
+    if isinstance(bytecode, dict):
+        bytecode = bytecode.get('object')
+    if not bytecode:
+        raise ValueError(f"{path}: no bytecode")
+    if not bytecode.startswith('0x'):
+        bytecode = '0x' + bytecode
+    return artifact.get('abi', []), bytecode
+
+
+def constructor_data(abi, bytecode, args):
+    constructor = next((item for item in abi if item.get('type') == 'constructor'), None)
+    if not args:
+        return bytecode
+    if constructor is None:
+        raise ValueError("constructor arguments given but the ABI has no constructor")
+    types = [item['type'] for item in constructor['inputs']]
+    return bytecode + encode(types, args).hex()
+
+
+class TxSeeder:
+    def __init__(self, manager, private_key, eip1559=False):
+        self.manager = manager
+        self.client = manager.client
+        self.account = Account.from_key(private_key)
+        self.fee_fields = get_chain_cache(self.client).tx_fields(eip1559)
+        self.tracker = ConfirmationTracker(self.client)
+        self.sender = NonceSender(self.client, private_key)
+
+    def send_pipelined(self, transactions, timeout=300):
+        # Все транзакции подписываются с последовательными nonce и отправляются
+        # пакетами, подтверждение - одним ожиданием на весь набор
+        items = self.sender.send([dict(self.fee_fields, **transaction) for transaction in transactions])
+        errors = [item['error'] for item in items if item['status'] != 'sent']
+        if errors:
+            raise RuntimeError(f"{len(errors)} of {len(items)} transactions rejected: {errors[0]}")
+
+        receipts = self.tracker.wait([item['tx_hash'] for item in items], timeout=timeout)
+        ordered = [receipts.get(item['tx_hash']) for item in items]
+        failed = sum(1 for receipt in ordered if receipt is None or receipt.get('status') != 1)
+        if failed:
+            raise RuntimeError(f"{failed} of {len(items)} transactions failed or timed out")
+        return ordered
+
+    def estimate(self, transaction):
+        estimate = self.client.request("eth_estimateGas", [dict({'from': self.account.address}, **transaction)])
+        return int(int(estimate, 16) * 1.2)
+
+    def deploy(self, contracts):
+        transactions = []
+        for contract in contracts:
+            abi, bytecode = load_artifact(contract['artifact'])
+            data = constructor_data(abi, bytecode, contract.get('args', []))
+            transactions.append({'data': data, 'value': 0, 'gas': contract.get('gas') or self.estimate({'data': data})})
+        receipts = self.send_pipelined(transactions)
+        return {contract['name']: receipt['contractAddress'] for contract, receipt in zip(contracts, receipts)}
+
+    def seed_calls(self, token, holders, amount, selector):
+        amount_bytes = int(amount).to_bytes(32, 'big')
+        calldata = ['0x' + selector + (address_word(holder) + amount_bytes).hex() for holder in holders]
+        # Оценка для нового адреса: запись нулевого баланса (zero -> nonzero SSTORE) самая дорогая
+        empty_holder = '0x' + os.urandom(20).hex()
+        gas = self.estimate({'to': token, 'data': '0x' + selector + (address_word(empty_holder) + amount_bytes).hex()})
+        self.send_pipelined([{'to': token, 'data': data, 'gas': gas, 'value': 0} for data in calldata])
+
+
+class StorageSeeder:
+    # Прямые записи балансов в storage токена; ключ деплоера не нужен
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.client = manager.client
+
+    def balance_of(self, token, holders):
+        results = self.client.batch_call([("eth_call", [{'to': token, 'data': BALANCE_OF + address_word(holder).hex()}, "latest"])
+                                          for holder in holders])
+        return [int(result['result'], 16) if result['error'] is None else None for result in results]
+
+    def find_balance_slot(self, token):
+        # Пишем метку в кандидатный слот для пробного адреса и проверяем balanceOf
+        marker = 0x5eed
+        for slot in range(SLOT_PROBE_LIMIT):
+            key = balance_key(PROBE_ADDRESS, slot)
+            original = self.client.request("eth_getStorageAt", [token, key, "latest"])
+            self.manager.set_storage([(token, key, word(marker))])
+            found = self.balance_of(token, [PROBE_ADDRESS])[0] == marker
+            self.manager.set_storage([(token, key, word(int(original, 16)))])
+            if found:
+                return slot
+        raise RuntimeError(f"balance mapping slot of {token} not found in slots 0..{SLOT_PROBE_LIMIT - 1}")
+
+    def seed_storage(self, token, holders, amount, balance_slot=None, total_supply_slot=None):
+        slot = self.find_balance_slot(token) if balance_slot is None else balance_slot
+        keys = [balance_key(holder, slot) for holder in holders]
+        delta = 0
+        if total_supply_slot is not None:
+            previous = self.client.batch_call([("eth_getStorageAt", [token, key, "latest"]) for key in keys])
+            delta = sum(amount - int(result['result'], 16) for result in previous)
+
+        errors = [error for error in self.manager.set_storage([(token, key, word(amount)) for key in keys]) if error]
+        if errors:
+            raise RuntimeError(f"anvil_setStorageAt failed for {len(errors)} holders: {errors[0]}")
+
+        if total_supply_slot is not None:
+            supply_key = word(total_supply_slot)
+            supply = int(self.client.request("eth_getStorageAt", [token, supply_key, "latest"]), 16)
+            self.manager.set_storage([(token, supply_key, word(supply + delta))])
+        return slot
+
+
+def load_holders(store_path, wallet_type=None, limit=None):
+    with open_store(store_path, LEGACY_WALLETS_PATH) as store:
+        return [wallet['address'] for wallet in store.iter_wallets(wallet_type, limit=limit)]
+
+
+def run_pipeline(spec, manager, store_path, eip1559):
+    started = time.time()
+    result = {'contracts': {}, 'tokens': [], 'eth': [], 'snapshot': None}
+    private_key = spec.get('deployer_key') or os.getenv(spec.get('deployer_key_env', 'GENESIS_PRIVATE_KEY'))
+    seeder = TxSeeder(manager, private_key, eip1559) if private_key else None
+    storage = StorageSeeder(manager)
+
+    if spec.get('contracts'):
+        if seeder is None:
+            raise RuntimeError("deployer key is required to deploy contracts")
+        step_started = time.time()
+        result['contracts'] = seeder.deploy(spec['contracts'])
+        print(f"Deployed {len(result['contracts'])} contracts in {time.time() - step_started:.2f}s")
+        for name, address in result['contracts'].items():
+            print(f"  {name}: {address}")
+
+    for entry in spec.get('tokens', []):
+        token = result['contracts'].get(entry['contract'], entry['contract'])
+        holders = load_holders(store_path, entry.get('wallet_type'), entry.get('limit'))
+        amount = int(entry['amount'])
+        mode = entry.get('mode', 'storage')
+        step_started = time.time()
+
+        if mode == 'storage':
+            slot = storage.seed_storage(token, holders, amount, entry.get('balance_slot'), entry.get('total_supply_slot'))
+        elif mode in ('transfer', 'mint'):
+            if seeder is None:
+                raise RuntimeError(f"deployer key is required for {mode} mode")
+            seeder.seed_calls(token, holders, amount, TRANSFER if mode == 'transfer' else MINT)
+            slot = None
+        else:
+            raise ValueError(f"unknown token mode: {mode}")
+
+        sample = storage.balance_of(token, holders[:VERIFY_SAMPLE])
+        verified = all(balance is not None and balance >= amount for balance in sample)
+        elapsed = time.time() - step_started
+        print(f"{entry['contract']}: {len(holders)} holders via {mode} in {elapsed:.2f}s, sample {'verified' if verified else 'MISMATCH'}")
+        result['tokens'].append({'contract': entry['contract'], 'token': token, 'mode': mode, 'holders': len(holders),
+                                 'amount': str(amount), 'balance_slot': slot, 'verified': verified})
+
+    for entry in spec.get('eth', []):
+        holders = load_holders(store_path, entry.get('wallet_type'), entry.get('limit'))
+        wei = int(Decimal(str(entry['amount_ether'])) * 10 ** 18)
+        errors = [error for error in manager.set_balances([(holder, wei) for holder in holders]) if error]
+        if errors:
+            raise RuntimeError(f"anvil_setBalance failed for {len(errors)} holders: {errors[0]}")
+        print(f"Set ETH balance {entry['amount_ether']} for {len(holders)} wallets")
+        result['eth'].append({'wallet_type': entry.get('wallet_type'), 'holders': len(holders), 'amount_ether': str(entry['amount_ether'])})
+
+    if spec.get('snapshot'):
+        result['snapshot'] = {'name': spec['snapshot'], 'id': SnapshotPool(manager).checkpoint(spec['snapshot'])}
+        print(f"Snapshot checkpoint {spec['snapshot']}: {result['snapshot']['id']}")
+
+    result['elapsed_seconds'] = round(time.time() - started, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deploy contract artifacts and seed ERC-20 balances for the fleet")
+    parser.add_argument('spec', help="seed specification (JSON)")
+    parser.add_argument('--rpc-url', default=None)
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH)
+    parser.add_argument('--output', default=RESULT_PATH)
+    parser.add_argument('--eip1559', action='store_true')
+    args = parser.parse_args()
+
+    with open(args.spec, 'r') as f:
+        spec = json.load(f)
+
+    manager = AnvilManager(args.rpc_url)
+    try:
+        result = run_pipeline(spec, manager, args.store, args.eip1559)
+    except (RuntimeError, ValueError, KeyError, RpcError) as e:
+        print(f"Seeding failed: {e}")
+        sys.exit(1)
+
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Seeding completed in {result['elapsed_seconds']}s, result written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,24 +14,31 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import csv
+import json
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 from web3 import Web3
+from chain_cache import get_chain_cache, max_fee_per_gas
+from confirmations import ConfirmationTracker, NonceSender, normalize_hash
+from rpc_client import POOL_SIZE, get_client
+from wallet_store import DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH, open_store
 
-web3_url = 'http://localhost:8545'
+TRANSFER_GAS = 21000
+BULK_WORKERS = POOL_SIZE
 
 
 def transfer_funds(from_address, from_private_key, to_address, amount_eth):
-    w3 = Web3(Web3.HTTPProvider(web3_url))
-
-    if not w3.is_connected():
-        print("❌ Cannot connect to Anvil")
-        return False
+    client = get_client()
+    w3 = client.web3
 
     try:
         amount_wei = w3.to_wei(amount_eth, 'ether')
         from_balance = w3.eth.get_balance(from_address)
-        gas_price = w3.eth.gas_price
-        gas_cost = 21000 * gas_price
+        fee_fields = get_chain_cache(client).tx_fields()
+        gas_cost = 21000 * max_fee_per_gas(fee_fields)
 
         print(f"From: {from_address}")
         print(f"To: {to_address}")
@@ -45,23 +52,24 @@ def transfer_funds(from_address, from_private_key, to_address, amount_eth):
 
         nonce = w3.eth.get_transaction_count(from_address)
 
-        transaction = {
+        transaction = dict(fee_fields, **{
             'to': to_address,
             'value': amount_wei,
             'gas': 21000,
-            'gasPrice': gas_price,
-            'nonce': nonce,
-            'chainId': w3.eth.chain_id
-        }
+            'nonce': nonce
+        })
 
         signed_txn = w3.eth.account.sign_transaction(transaction, private_key=from_private_key)
         tx_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
 
         print(f"Transaction hash: {tx_hash.hex()}")
 
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+        receipt = ConfirmationTracker(client).wait([tx_hash], timeout=120)[normalize_hash(tx_hash)]
 
-        if receipt.status == 1:
+        if receipt is None:
+            print("❌ Transaction not confirmed")
+            return False
+        elif receipt['status'] == 1:
             new_balance = w3.eth.get_balance(from_address)
             to_balance = w3.eth.get_balance(to_address)
             print(f"✅ Transfer successful")
@@ -77,9 +85,163 @@ def transfer_funds(from_address, from_private_key, to_address, amount_eth):
         return False
 
 
+def load_rows(path):
+    # CSV (from,to,amount[,private_key]) или JSONL с теми же полями
+    rows = []
+    with open(path, 'r') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    rows.append(json.loads(line))
+        else:
+            for record in csv.reader(f):
+                if not record or record[0].strip().lower() == 'from':
+                    continue
+                row = {'from': record[0].strip(), 'to': record[1].strip(), 'amount': record[2].strip()}
+                if len(record) > 3 and record[3].strip():
+                    row['private_key'] = record[3].strip()
+                rows.append(row)
+    return rows
+
+
+def fanout_rows(store, from_type, to_type, amount_eth):
+    # Получатели типа to_type распределяются по отправителям типа from_type по кругу
+    senders = [wallet['address'] for wallet in store.iter_wallets(from_type)]
+    if not senders:
+        return []
+    return [{'from': senders[i % len(senders)], 'to': wallet['address'], 'amount': amount_eth}
+            for i, wallet in enumerate(store.iter_wallets(to_type))]
+
+
+def _emit(lock, event):
+    with lock:
+        sys.stdout.write(json.dumps(event) + '\n')
+        sys.stdout.flush()
+
+
+def _submit_event(row, **fields):
+    return dict({'event': 'submit', 'row': row['row'], 'from': row['from'], 'to': row['to'], 'amount': str(row['amount'])}, **fields)
+
+
+def _send_shard(client, shard, private_key, nonce, fee_fields, lock):
+    # Строки одного отправителя отправляются одним пакетом по порядку nonce,
+    # отказы и сдвиг nonce обрабатывает NonceSender
+    transactions = []
+    valid = []
+    for row in shard:
+        if private_key is None:
+            row['status'] = 'failed'
+            _emit(lock, _submit_event(row, status='failed', error='private key not found'))
+            continue
+        try:
+            transactions.append(dict(fee_fields, **{
+                'to': Web3.to_checksum_address(row['to']),
+                'value': Web3.to_wei(Decimal(str(row['amount'])), 'ether'),
+                'gas': TRANSFER_GAS
+            }))
+            valid.append(row)
+        except Exception as e:
+            # Некорректная строка (адрес, сумма) не останавливает остальные строки шарда
+            row['status'] = 'failed'
+            _emit(lock, _submit_event(row, status='failed', error=f"invalid row: {e}"))
+    if not valid:
+        return
+
+    try:
+        sender = NonceSender(client, private_key, nonce)
+    except Exception as e:
+        for row in valid:
+            row['status'] = 'failed'
+            _emit(lock, _submit_event(row, status='failed', error=f"invalid private key: {e}"))
+        return
+
+    for row, item in zip(valid, sender.send(transactions)):
+        row['status'] = item['status']
+        if item['status'] == 'sent':
+            row['tx_hash'] = item['tx_hash']
+            _emit(lock, _submit_event(row, status='sent', tx_hash=row['tx_hash']))
+        else:
+            _emit(lock, _submit_event(row, status='failed', error=item['error']))
+
+
+def bulk_transfer(rows, workers=BULK_WORKERS, timeout=120):
+    client = get_client()
+    fee_fields = get_chain_cache(client).tx_fields()
+
+    shards = {}
+    lock = threading.Lock()
+    for index, row in enumerate(rows):
+        row['row'] = index
+        try:
+            row['from'] = Web3.to_checksum_address(row['from'])
+        except Exception as e:
+            row['status'] = 'failed'
+            _emit(lock, {'event': 'submit', 'row': index, 'from': row['from'], 'status': 'failed', 'error': f"invalid row: {e}"})
+            continue
+        shards.setdefault(row['from'], []).append(row)
+
+    keys = {}
+    with open_store(DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH) as store:
+        for sender, shard in shards.items():
+            key = next((row['private_key'] for row in shard if row.get('private_key')), None)
+            if key is None:
+                wallet = store.get_by_address(sender)
+                key = wallet['private_key'] if wallet else None
+            keys[sender] = key
+
+    senders = list(shards)
+    nonces = client.batch_call([("eth_getTransactionCount", [sender, 'pending']) for sender in senders])
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for sender, nonce in zip(senders, nonces):
+            if nonce['error'] is not None:
+                for row in shards[sender]:
+                    row['status'] = 'failed'
+                    _emit(lock, {'event': 'submit', 'row': row['row'], 'from': sender, 'status': 'failed', 'error': nonce['error']})
+                continue
+            futures.append(executor.submit(_send_shard, client, shards[sender], keys[sender],
+                                           int(nonce['result'], 16), fee_fields, lock))
+        for future in futures:
+            future.result()
+
+    sent = [row for row in rows if row.get('status') == 'sent']
+    receipts = ConfirmationTracker(client).wait([row['tx_hash'] for row in sent], timeout=timeout)
+    confirmed = 0
+    for row in sent:
+        receipt = receipts.get(row['tx_hash'])
+        if receipt is None:
+            status = 'unconfirmed'
+        elif receipt['status'] == 1:
+            status = 'confirmed'
+            confirmed += 1
+        else:
+            status = 'reverted'
+        _emit(lock, {'event': 'confirm', 'row': row['row'], 'tx_hash': row['tx_hash'], 'status': status,
+                     'block': receipt['blockNumber'] if receipt else None})
+
+    print(f"Bulk transfer: {len(rows)} rows, {len(senders)} senders, {len(sent)} sent, {confirmed} confirmed",
+          file=sys.stderr)
+    return confirmed == len(rows)
+
+
 def main():
+    if len(sys.argv) >= 3 and sys.argv[1] == "bulk":
+        workers = int(sys.argv[3]) if len(sys.argv) > 3 else BULK_WORKERS
+        success = bulk_transfer(load_rows(sys.argv[2]), workers)
+        sys.exit(0 if success else 1)
+
+    if len(sys.argv) >= 5 and sys.argv[1] == "fanout":
+        with open_store(DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH) as store:
+            rows = fanout_rows(store, sys.argv[2], sys.argv[3], sys.argv[4])
+        workers = int(sys.argv[5]) if len(sys.argv) > 5 else BULK_WORKERS
+        success = bool(rows) and bulk_transfer(rows, workers)
+        sys.exit(0 if success else 1)
+
     if len(sys.argv) != 5:
         print("Usage: python3 transfer.py <from_address> <private_key> <to_address> <amount_eth>")
+        print("       python3 transfer.py bulk <rows.csv|rows.jsonl> [workers]")
+        print("       python3 transfer.py fanout <from_type> <to_type> <amount_eth> [workers]")
         print("Example: python3 transfer.py 0x123... 0xabc... 0x456... 1.5")
         sys.exit(1)
 
@@ -93,4 +255,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import aiohttp
+from eth_account import Account
+from confirmations import raw_transaction_hex
+from fleet_scanner import TIMEOUT, ScanError, post_batch
+from rpc_client import resolve_endpoint
+from wallet_store import DEFAULT_STORE_PATH, LEGACY_WALLETS_PATH, open_store
+
+BUMP_PERMILLE = int(os.getenv('TXPOOL_BUMP_PERMILLE', '125'))
+GAP_FILL_GAS = 21000
+
+
+def emit(event):
+    sys.stdout.write(json.dumps(event) + '\n')
+    sys.stdout.flush()
+
+
+def _int(value):
+    return int(value, 16) if isinstance(value, str) else value
+
+
+def bump(value, minimum=0):
+    # Замена транзакции с тем же nonce принимается только с заметно большей комиссией
+    return max(value + value * BUMP_PERMILLE // 1000 + 1, minimum)
+
+
+class KeyRing:
+    # Ключи отправителей: переменные окружения *_PRIVATE_KEY и хранилище кошельков
+    def __init__(self, store_path=DEFAULT_STORE_PATH):
+        self.keys = {}
+        for name, value in os.environ.items():
+            if name.endswith('_PRIVATE_KEY') and value:
+                try:
+                    self.keys[Account.from_key(value).address.lower()] = value
+                except (ValueError, TypeError):
+                    pass
+        self.store = open_store(store_path, LEGACY_WALLETS_PATH) if os.path.exists(store_path) else None
+
+    def get(self, address):
+        address = address.lower()
+        if address not in self.keys and self.store is not None:
+            wallet = self.store.get_by_address(address)
+            self.keys[address] = wallet['private_key'] if wallet else None
+        return self.keys.get(address)
+
+
+class TxpoolMonitor:
+    def __init__(self, rpc_url, keyring, stuck_after, fix, chain_id=None):
+        self.rpc_url = rpc_url
+        self.keyring = keyring
+        self.stuck_after = stuck_after
+        self.fix = fix
+        self.chain_id = chain_id
+        self.first_seen = {}
+
+    async def rpc(self, session, calls):
+        responses = await post_batch(session, self.rpc_url, calls)
+        results = []
+        for method, response in zip([method for method, _ in calls], responses):
+            if response is None or response.get('error') is not None:
+                raise ScanError(f"{method}: {response['error'] if response else 'missing response'}")
+            results.append(response['result'])
+        return results
+
+    async def sample(self, session):
+        status, content, gas_price, latest, chain_id = await self.rpc(session, [
+            ("txpool_status", []),
+            ("txpool_content", []),
+            ("eth_gasPrice", []),
+            ("eth_getBlockByNumber", ["latest", False]),
+            ("eth_chainId", [])
+        ])
+        self.chain_id = self.chain_id or _int(chain_id)
+        fees = {'gas_price': _int(gas_price), 'base_fee': _int(latest.get('baseFeePerGas') or '0x0')}
+
+        senders = sorted(set(content.get('pending', {})) | set(content.get('queued', {})))
+        nonces = await self.rpc(session, [("eth_getTransactionCount", [sender, "latest"]) for sender in senders]) if senders else []
+        return {
+            'pending': _int(status.get('pending', '0x0')),
+            'queued': _int(status.get('queued', '0x0')),
+            'fees': fees,
+            'senders': {sender: {
+                'nonce': _int(nonce),
+                'pending': {int(n): tx for n, tx in content.get('pending', {}).get(sender, {}).items()},
+                'queued': {int(n): tx for n, tx in content.get('queued', {}).get(sender, {}).items()}
+            } for sender, nonce in zip(senders, nonces)}
+        }
+
+    def analyze(self, snapshot, now):
+        # Пропуски: nonce от текущего nonce аккаунта до максимального в пуле, которых нет ни в pending,
+        # ни в queued. Зависшие: pending транзакции с ценой ниже текущей или висящие дольше stuck_after
+        fees = snapshot['fees']
+        gaps = []
+        stuck = []
+        seen = set()
+        for sender, entry in snapshot['senders'].items():
+            known = set(entry['pending']) | set(entry['queued'])
+            if entry['queued']:
+                missing = [nonce for nonce in range(entry['nonce'], max(entry['queued'])) if nonce not in known]
+                if missing:
+                    gaps.append({'sender': sender, 'nonces': missing})
+
+            for nonce, tx in sorted(entry['pending'].items()):
+                key = (sender, nonce, tx['hash'])
+                seen.add(key)
+                first_seen = self.first_seen.setdefault(key, now)
+                price = _int(tx.get('maxFeePerGas') or tx.get('gasPrice') or '0x0')
+                # type 2 включается, пока maxFeePerGas не ниже base fee; чаевые лишь уменьшаются
+                required = fees['base_fee'] if tx.get('maxFeePerGas') else fees['gas_price']
+                if price < required:
+                    stuck.append({'sender': sender, 'nonce': nonce, 'hash': tx['hash'], 'reason': 'underpriced',
+                                  'price': price, 'required': required})
+                elif now - first_seen >= self.stuck_after:
+                    stuck.append({'sender': sender, 'nonce': nonce, 'hash': tx['hash'], 'reason': 'stalled',
+                                  'price': price, 'age': round(now - first_seen, 1)})
+        self.first_seen = {key: value for key, value in self.first_seen.items() if key in seen}
+        return gaps, stuck
+
+    def fee_fields(self, tx, fees):
+        if tx is not None and tx.get('maxFeePerGas'):
+            tip = bump(_int(tx['maxPriorityFeePerGas']))
+            return {'type': 2, 'maxPriorityFeePerGas': tip,
+                    'maxFeePerGas': bump(_int(tx['maxFeePerGas']), fees['base_fee'] * 2 + tip)}
+        if tx is not None:
+            return {'gasPrice': bump(_int(tx['gasPrice']), fees['gas_price'])}
+        return {'gasPrice': fees['gas_price']}
+
+    def build_replacement(self, tx, fees):
+        replacement = {
+            'chainId': self.chain_id,
+            'nonce': _int(tx['nonce']),
+            'to': tx.get('to'),
+            'value': _int(tx['value']),
+            'gas': _int(tx['gas']),
+            'data': tx.get('input') or '0x'
+        }
+        replacement.update(self.fee_fields(tx, fees))
+        if replacement['to'] is None:
+            del replacement['to']
+        return replacement
+
+    def build_gap_filler(self, sender, nonce, fees):
+        filler = {'chainId': self.chain_id, 'nonce': nonce, 'to': sender, 'value': 0, 'gas': GAP_FILL_GAS}
+        filler.update(self.fee_fields(None, fees))
+        return filler
+
+    async def repair(self, session, snapshot, gaps, stuck):
+        fees = snapshot['fees']
+        signed = []
+        for gap in gaps:
+            key = self.keyring.get(gap['sender'])
+            if key is None:
+                emit({'event': 'skip', 'sender': gap['sender'], 'reason': 'no private key'})
+                continue
+            for nonce in gap['nonces']:
+                transaction = self.build_gap_filler(gap['sender'], nonce, fees)
+                signed.append(('fill_gap', gap['sender'], nonce, Account.sign_transaction(transaction, key)))
+
+        for item in stuck:
+            key = self.keyring.get(item['sender'])
+            if key is None:
+                emit({'event': 'skip', 'sender': item['sender'], 'reason': 'no private key'})
+                continue
+            tx = snapshot['senders'][item['sender']]['pending'][item['nonce']]
+            transaction = self.build_replacement(tx, fees)
+            signed.append(('replace', item['sender'], item['nonce'], Account.sign_transaction(transaction, key)))
+
+        if not signed:
+            return
+        responses = await post_batch(session, self.rpc_url,
+                                     [("eth_sendRawTransaction", [raw_transaction_hex(item[3])]) for item in signed])
+        for (action, sender, nonce, _), response in zip(signed, responses):
+            error = response.get('error') if response else 'missing response'
+            emit({'event': action, 'sender': sender, 'nonce': nonce,
+                  'tx_hash': response.get('result') if response else None,
+                  'error': error.get('message', str(error)) if isinstance(error, dict) else error})
+
+    async def run(self, interval, once=False):
+        timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            while True:
+                started = time.monotonic()
+                try:
+                    snapshot = await self.sample(session)
+                    gaps, stuck = self.analyze(snapshot, time.time())
+                    emit({'event': 'sample', 'pending': snapshot['pending'], 'queued': snapshot['queued'],
+                          'senders': len(snapshot['senders']), 'gaps': gaps, 'stuck': stuck})
+                    if self.fix and (gaps or stuck):
+                        await self.repair(session, snapshot, gaps, stuck)
+                except (aiohttp.ClientError, ScanError, asyncio.TimeoutError) as e:
+                    emit({'event': 'error', 'error': str(e)})
+                if once:
+                    return
+                await asyncio.sleep(max(interval - (time.monotonic() - started), 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect nonce gaps and stuck transactions in the Anvil txpool")
+    parser.add_argument('--rpc-url', default=None)
+    parser.add_argument('--interval', type=float, default=2.0)
+    parser.add_argument('--stuck-after', type=float, default=30.0, help="seconds a pending tx may wait before it is replaced")
+    parser.add_argument('--fix', action='store_true', help="fill nonce gaps and replace stuck transactions with a fee bump")
+    parser.add_argument('--once', action='store_true', help="sample once and exit")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH)
+    args = parser.parse_args()
+
+    monitor = TxpoolMonitor(args.rpc_url or resolve_endpoint(), KeyRing(args.store), args.stuck_after, args.fix)
+    try:
+        asyncio.run(monitor.run(args.interval, args.once))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
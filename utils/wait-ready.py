@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import os
+import sys
+from readiness import DEADLINE, STATE_ADDRESS, wait_until_ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wait until the Anvil JSON-RPC endpoint is ready")
+    parser.add_argument('--rpc-url', default=None, help="endpoint (default: ANVIL_RPC_URL or http://localhost:8545)")
+    parser.add_argument('--deadline', type=float, default=DEADLINE, help="seconds to wait before failing")
+    parser.add_argument('--chain-id', type=int, default=int(os.environ['CHAIN_ID']) if os.getenv('CHAIN_ID') else None)
+    parser.add_argument('--address', default=STATE_ADDRESS,
+                        help="address that must have a non-zero balance once state is loaded "
+                             "(default: GENESIS_ACCOUNT or GENESIS_ACCOUNT_ADDRESS, '' disables the check)")
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+
+    log = None if args.quiet else print
+    result = wait_until_ready(args.rpc_url, args.deadline, args.chain_id, args.address, log)
+
+    if result['ready']:
+        if not args.quiet:
+            print(f"Anvil ready in {result['elapsed']:.2f}s after {result['attempts']} attempts ({result['detail']})")
+        sys.exit(0)
+
+    print(f"Anvil not ready after {result['elapsed']:.2f}s ({result['attempts']} attempts): {result['detail']}", file=sys.stderr)
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
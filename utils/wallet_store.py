@@ -0,0 +1,342 @@
+# Copyright 2025 Linkora DEX
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import sqlite3
+import textwrap
+
+DEFAULT_STORE_PATH = '/app/config/wallets.db'
+LEGACY_WALLETS_PATH = '/app/config/wallets.json'
+FETCH_SIZE = 1000
+
+# Целевые балансы уровней флота (wei): generate-wallets.py и rebalance-fleet.py
+TIER_BALANCES = {
+    'high': 500000000000000000,
+    'medium': 100000000000000000,
+    'low': 50000000000000000
+}
+
+COLUMNS = ('wallet_id', 'address', 'private_key', 'mnemonic', 'derivation_index', 'balance', 'balance_ether', 'type')
+
+
+class WalletStore:
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS wallets (
+                wallet_id INTEGER PRIMARY KEY,
+                address TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                private_key TEXT,
+                mnemonic TEXT,
+                derivation_index INTEGER,
+                balance TEXT,
+                balance_ether TEXT,
+                type TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS wallets_type ON wallets (type, wallet_id)")
+        # Счётчики и суммы балансов по типам обновляются в append(), чтобы сводка
+        # не читала всю таблицу; total_wei - TEXT, сумма флота не влезает в INTEGER
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS wallet_totals (
+                type TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                total_wei TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+        if self.conn.execute("SELECT 1 FROM wallet_totals LIMIT 1").fetchone() is None \
+                and self.conn.execute("SELECT 1 FROM wallets LIMIT 1").fetchone() is not None:
+            self._rebuild_totals()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _rebuild_totals(self):
+        # Однократный пересчёт для хранилища, созданного до появления wallet_totals
+        totals = {}
+        for row in self.conn.execute("SELECT type, balance, COUNT(*) FROM wallets GROUP BY type, balance"):
+            entry = totals.setdefault(row[0] or '', [0, 0])
+            entry[0] += row[2]
+            entry[1] += int(row[1]) * row[2]
+        with self.conn:
+            self.conn.execute("DELETE FROM wallet_totals")
+            self.conn.executemany("INSERT INTO wallet_totals (type, count, total_wei) VALUES (?, ?, ?)",
+                                  [(wallet_type, count, str(total)) for wallet_type, (count, total) in totals.items()])
+
+    def count(self, wallet_type=None):
+        if wallet_type is None:
+            return self.conn.execute("SELECT COALESCE(SUM(count), 0) FROM wallet_totals").fetchone()[0]
+        row = self.conn.execute("SELECT count FROM wallet_totals WHERE type = ?", (wallet_type,)).fetchone()
+        return row[0] if row else 0
+
+    def next_wallet_id(self):
+        return self.conn.execute("SELECT COALESCE(MAX(wallet_id) + 1, 0) FROM wallets").fetchone()[0]
+
+    def append(self, wallets):
+        rows = [(
+            wallet['wallet_id'],
+            wallet['address'],
+            wallet.get('private_key'),
+            wallet.get('mnemonic'),
+            wallet.get('index'),
+            str(wallet['balance']),
+            wallet.get('balance_ether'),
+            wallet.get('type')
+        ) for wallet in wallets]
+        added = {}
+        for row in rows:
+            entry = added.setdefault(row[7] or '', [0, 0])
+            entry[0] += 1
+            entry[1] += int(row[5])
+        with self.conn:
+            self.conn.executemany(f"INSERT INTO wallets ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+            for wallet_type, (count, total) in added.items():
+                current = self.conn.execute("SELECT count, total_wei FROM wallet_totals WHERE type = ?", (wallet_type,)).fetchone()
+                if current is not None:
+                    count += current[0]
+                    total += int(current[1])
+                self.conn.execute("INSERT OR REPLACE INTO wallet_totals (type, count, total_wei) VALUES (?, ?, ?)",
+                                  (wallet_type, count, str(total)))
+        return len(rows)
+
+    def iter_wallets(self, wallet_type=None, offset=0, limit=None):
+        query = "SELECT * FROM wallets"
+        params = []
+        if wallet_type is not None:
+            query += " WHERE type = ?"
+            params.append(wallet_type)
+        query += " ORDER BY wallet_id LIMIT ? OFFSET ?"
+        params.extend([-1 if limit is None else limit, offset])
+
+        cursor = self.conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield _row_to_wallet(row)
+
+    def get_by_address(self, address):
+        row = self.conn.execute("SELECT * FROM wallets WHERE address = ?", (address,)).fetchone()
+        return _row_to_wallet(row) if row else None
+
+    def get_by_id(self, wallet_id):
+        row = self.conn.execute("SELECT * FROM wallets WHERE wallet_id = ?", (wallet_id,)).fetchone()
+        return _row_to_wallet(row) if row else None
+
+    def balance_totals(self):
+        # {type: {'count': n, 'total_wei': sum}} из wallet_totals, без чтения таблицы кошельков
+        return {row[0] or None: {'count': row[1], 'total_wei': int(row[2])}
+                for row in self.conn.execute("SELECT type, count, total_wei FROM wallet_totals")}
+
+    def import_json(self, path):
+        with open(path, 'r') as f:
+            wallets = json.load(f)
+        for wallet_id, wallet in enumerate(wallets):
+            wallet.setdefault('wallet_id', wallet_id)
+        return self.append(wallets)
+
+
+def _row_to_wallet(row):
+    return {
+        'wallet_id': row['wallet_id'],
+        'address': row['address'],
+        'private_key': row['private_key'],
+        'mnemonic': row['mnemonic'],
+        'index': row['derivation_index'],
+        'balance': row['balance'],
+        'balance_ether': row['balance_ether'],
+        'type': row['type']
+    }
+
+
+def open_store(path=DEFAULT_STORE_PATH, legacy_path=LEGACY_WALLETS_PATH):
+    # При первом открытии переносит кошельки из старого wallets.json
+    store = WalletStore(path)
+    if store.count() == 0 and legacy_path and os.path.exists(legacy_path):
+        try:
+            imported = store.import_json(legacy_path)
+            print(f"Imported {imported} wallets from {legacy_path} into {path}")
+        except Exception as e:
+            print(f"Cannot import {legacy_path}: {e}")
+    return store
+
+
+def _format_item(item):
+    return textwrap.indent(json.dumps(item, indent=2), '  ')
+
+
+def append_json_array(filepath, items):
+    # Дописывает элементы в конец JSON-массива, переписывая только закрывающую скобку
+    items = list(items)
+    if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+        write_json_array(filepath, items)
+        return
+    if not items:
+        return
+
+    with open(filepath, 'r+b') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        closing_found = False
+        while position > 0:
+            position -= 1
+            f.seek(position)
+            char = f.read(1)
+            if char.isspace():
+                continue
+            if not closing_found:
+                if char != b']':
+                    raise ValueError(f"{filepath} is not a JSON array")
+                closing_found = True
+                continue
+            break
+
+        f.seek(position + 1)
+        f.truncate()
+        separator = '\n' if char == b'[' else ',\n'
+        f.write((separator + ',\n'.join(_format_item(item) for item in items) + '\n]').encode())
+
+
+def write_json_array(filepath, items):
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write('[')
+        first = True
+        for item in items:
+            f.write('\n' if first else ',\n')
+            f.write(_format_item(item))
+            first = False
+        f.write('\n]' if not first else ']')
+    os.replace(tmp_path, filepath)
+
+
+def iter_json_array(filepath, chunk_size=1 << 20):
+    # Потоковое чтение JSON-массива объектов: в памяти только текущий буфер и элемент,
+    # чтение файла прекращается, как только потребитель перестаёт брать элементы
+    decoder = json.JSONDecoder()
+    with open(filepath, 'r') as f:
+        buffer = ''
+        position = 0
+        started = False
+        while True:
+            chunk = f.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            while True:
+                while position < len(buffer) and (buffer[position].isspace() or buffer[position] == ','):
+                    position += 1
+                if position >= len(buffer):
+                    break
+                if not started:
+                    if buffer[position] != '[':
+                        raise ValueError(f"{filepath}: expected a JSON array")
+                    started = True
+                    position += 1
+                    continue
+                if buffer[position] == ']':
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    break
+                position = end
+                yield item
+            if not chunk:
+                return
+
+
+def iter_jsonl(filepath):
+    with open(filepath, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def genesis_entry(wallet):
+    return {'address': wallet['address'], 'balance': wallet['balance']}
+
+
+def metamask_entry(wallet):
+    return {
+        'mnemonic': wallet['mnemonic'],
+        'address': wallet['address'],
+        'private_key': wallet['private_key'],
+        'balance_ether': wallet['balance_ether'],
+        'type': wallet['type']
+    }
+
+
+def legacy_entry(wallet):
+    return {
+        'address': wallet['address'],
+        'private_key': wallet['private_key'],
+        'mnemonic': wallet['mnemonic'],
+        'index': wallet['index'],
+        'balance': wallet['balance'],
+        'balance_ether': wallet['balance_ether'],
+        'type': wallet['type'],
+        'wallet_id': wallet['wallet_id']
+    }
+
+
+EXPORTS = {
+    'wallets.json': legacy_entry,
+    'genesis-accounts.json': genesis_entry,
+    'metamask-wallets.json': metamask_entry
+}
+
+
+def export_wallets(store, output_dir, new_wallets):
+    # Новые кошельки дописываются в существующие экспорты; если файла экспорта нет,
+    # он целиком пересобирается потоком из хранилища
+    new_wallets = list(new_wallets)
+    for filename, formatter in EXPORTS.items():
+        filepath = os.path.join(output_dir, filename)
+        if os.path.exists(filepath):
+            append_json_array(filepath, (formatter(wallet) for wallet in new_wallets))
+        else:
+            write_json_array(filepath, (formatter(wallet) for wallet in store.iter_wallets()))
+
+    keys_file = os.path.join(output_dir, 'private-keys.txt')
+    if os.path.exists(keys_file):
+        with open(keys_file, 'a') as f:
+            for wallet in new_wallets:
+                f.write(f"{wallet['private_key']}\n")
+    else:
+        with open(keys_file, 'w') as f:
+            for wallet in store.iter_wallets():
+                f.write(f"{wallet['private_key']}\n")
+
+
+def rebuild_exports(store, output_dir):
+    for filename, formatter in EXPORTS.items():
+        write_json_array(os.path.join(output_dir, filename), (formatter(wallet) for wallet in store.iter_wallets()))
+
+    with open(os.path.join(output_dir, 'private-keys.txt'), 'w') as f:
+        for wallet in store.iter_wallets():
+            f.write(f"{wallet['private_key']}\n")